@@ -1,11 +1,24 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
-from .models import Category, Comment, Location, Page, Post
+from .models import Category, Comment, ImageBlob, Location, Page, Post
+from .search import COMMENT_INDEX, POST_INDEX, match_filter
 
 User = get_user_model()
 
 
+class FullTextSearchMixin:
+    """Поиск в админке по полнотекстовому индексу вместо LIKE-сканов"""
+
+    search_index = None
+
+    def get_search_results(self, request, queryset, search_term):
+        condition = match_filter(self.search_index, search_term)
+        if condition is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(condition), False
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ("title", "slug", "is_published", "created_at")
@@ -24,27 +37,30 @@ class LocationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         "title",
         "pub_date",
         "category",
         "author",
         "is_published",
+        "comment_count",
         "created_at",
     )
     list_filter = ("pub_date", "category", "author", "is_published")
     search_fields = ("title", "text")
+    search_index = POST_INDEX
     list_editable = ("is_published",)
     autocomplete_fields = ("author", "category", "location")
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         "post",
         "author",
         "text",
+        "reply_count",
         "created_at",
     )
     list_filter = (
@@ -52,6 +68,7 @@ class CommentAdmin(admin.ModelAdmin):
         "author",
     )
     search_fields = ("text",)
+    search_index = COMMENT_INDEX
     list_editable = ()
     autocomplete_fields = ("post", "author")
 
@@ -63,3 +80,27 @@ class PageAdmin(admin.ModelAdmin):
     search_fields = ("title", "content", "slug")
     list_editable = ("is_published",)
     prepopulated_fields = {"slug": ("title",)}
+
+
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "size",
+        "original_size",
+        "savings",
+        "ref_count",
+        "created_at",
+    )
+    search_fields = ("name",)
+    readonly_fields = (
+        "name",
+        "size",
+        "original_size",
+        "ref_count",
+        "created_at",
+    )
+
+    @admin.display(description="Экономия, байт")
+    def savings(self, blob):
+        return blob.savings
@@ -5,3 +5,6 @@ class BlogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     verbose_name = "Блог"
     name = "blog"
+
+    def ready(self):
+        from . import db, signals  # noqa: F401
@@ -0,0 +1,355 @@
+import math
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import invalidate, make_key
+from .models import (
+    MAX_LENGTH,
+    AutocompleteTerm,
+    AutocompleteTrigram,
+    Category,
+    Location,
+    Post,
+)
+
+User = get_user_model()
+
+AUTOCOMPLETE_KEY_PREFIX = "blog:autocomplete:"
+AUTOCOMPLETE_CACHE_TIMEOUT = 60
+AUTOCOMPLETE_LIMIT = 10
+MAX_QUERY_LENGTH = 64
+# Доля триграмм запроса, которая должна найтись в подписи
+MIN_SIMILARITY = 0.3
+# Сколько подписей читается из индекса для одной триграммы запроса:
+# частые триграммы («  п», « по») есть у большой доли подписей, и без
+# ограничения время подсказки росло бы вместе с таблицей
+MAX_POSTINGS_PER_GRAM = 200
+# Сколько подписей из самых редких триграмм запроса пересчитывается точно
+MAX_CANDIDATES = 300
+# Сколько самых редких триграмм должна содержать подпись, если все
+# триграммы запроса частые; чтобы выбрать самые редкие, частота
+# считается до FREQUENCY_LIMIT
+INTERSECT_GRAMS = 3
+FREQUENCY_LIMIT = 5000
+BATCH_SIZE = 500
+# Префиксные подсказки кэшируются с запасом на любой допустимый limit
+LOOKUP_CACHE_SIZE = 20
+
+
+def normalize(text):
+    """Нижний регистр, «ё» как «е», вместо знаков препинания — пробелы"""
+    return " ".join(re.findall(r"\w+", text.lower().replace("ё", "е")))
+
+
+def trigrams(key, partial=False):
+    """
+    Триграммы слов ключа с отступами по краям; при partial последнее
+    слово ещё набирается, и его конец не учитывается
+    """
+    words = key.split()
+    grams = set()
+    for index, word in enumerate(words):
+        padded = f"  {word}"
+        if not (partial and index == len(words) - 1):
+            padded += " "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _save_batch(kind, batch):
+    terms = AutocompleteTerm.objects.bulk_create(batch)
+    AutocompleteTrigram.objects.bulk_create(
+        (
+            AutocompleteTrigram(term=term, kind=kind, gram=gram)
+            for term in terms
+            for gram in term.grams
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def terms_scope(kind):
+    """Область кэша подсказок вида kind"""
+    return f"autocomplete:{kind}"
+
+
+def index_terms(kind, ids, terms):
+    """
+    Заменяет подсказки вида kind для объектов ids на terms;
+    объекты из ids, которых нет в terms, из подсказок пропадают
+    """
+    remove_terms(kind, ids)
+    batch = []
+    for term in terms:
+        term.kind = kind
+        term.key = normalize(term.label)[:MAX_LENGTH]
+        term.grams = trigrams(term.key)
+        term.gram_count = len(term.grams)
+        batch.append(term)
+        if len(batch) >= BATCH_SIZE:
+            _save_batch(kind, batch)
+            batch = []
+    if batch:
+        _save_batch(kind, batch)
+    invalidate(terms_scope(kind))
+
+
+def remove_terms(kind, ids):
+    """Удаляет подсказки вида kind для объектов ids вместе с триграммами"""
+    AutocompleteTerm.objects.filter(kind=kind, object_id__in=ids).delete()
+    invalidate(terms_scope(kind))
+
+
+def index_posts(posts):
+    """Подсказки по заголовкам видимых публикаций"""
+    rows = (
+        posts.filter(is_visible=True)
+        .order_by()
+        .values_list("pk", "title", "pub_date")
+    )
+    index_terms(
+        AutocompleteTerm.POST,
+        posts.values("pk"),
+        (
+            AutocompleteTerm(
+                object_id=pk,
+                label=title,
+                url=reverse("blog:post_detail", args=(pk,)),
+                available_from=pub_date,
+            )
+            for pk, title, pub_date in rows.iterator()
+        ),
+    )
+
+
+def index_users(users):
+    """Подсказки по именам активных пользователей"""
+    index_terms(
+        AutocompleteTerm.USER,
+        users.values("pk"),
+        (
+            AutocompleteTerm(
+                object_id=pk,
+                label=username,
+                url=reverse("blog:profile", args=(username,)),
+            )
+            for pk, username in users.filter(is_active=True)
+            .order_by()
+            .values_list("pk", "username")
+            .iterator()
+        ),
+    )
+
+
+def index_categories(categories):
+    """Подсказки по названиям опубликованных категорий"""
+    index_terms(
+        AutocompleteTerm.CATEGORY,
+        categories.values("pk"),
+        (
+            AutocompleteTerm(
+                object_id=pk,
+                label=title,
+                url=reverse("blog:category_posts", args=(slug,)),
+            )
+            for pk, title, slug in categories.filter(is_published=True)
+            .order_by()
+            .values_list("pk", "title", "slug")
+            .iterator()
+        ),
+    )
+
+
+def index_locations(locations):
+    """Подсказки по названиям опубликованных местоположений"""
+    index_terms(
+        AutocompleteTerm.LOCATION,
+        locations.values("pk"),
+        (
+            AutocompleteTerm(object_id=pk, label=name)
+            for pk, name in locations.filter(is_published=True)
+            .order_by()
+            .values_list("pk", "name")
+            .iterator()
+        ),
+    )
+
+
+def rebuild_index():
+    """Заново строит все подсказки"""
+    AutocompleteTerm.objects.all().delete()
+    index_posts(Post.objects.all())
+    index_users(User.objects.all())
+    index_categories(Category.objects.all())
+    index_locations(Location.objects.all())
+    return AutocompleteTerm.objects.count()
+
+
+def _gram_frequencies(grams, kinds):
+    """
+    Число подписей с каждой триграммой одним запросом; подсчёт идёт
+    не дальше FREQUENCY_LIMIT записей индекса (gram, kind, term)
+    """
+    kind_params = ", ".join(["%s"] * len(kinds))
+    select = (
+        f"SELECT %s, COUNT(*) FROM (SELECT 1 FROM"
+        f" {AutocompleteTrigram._meta.db_table} WHERE gram = %s"
+        f" AND kind IN ({kind_params}) LIMIT %s)"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            " UNION ALL ".join([select] * len(grams)),
+            [
+                param
+                for gram in grams
+                for param in (gram, gram, *kinds, FREQUENCY_LIMIT)
+            ],
+        )
+        return cursor.fetchall()
+
+
+def _union_ids(querysets):
+    """Первые столбцы строк querysets, выбранные одним запросом"""
+    parts = [queryset.query.sql_with_params() for queryset in querysets]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            " UNION ALL ".join(f"SELECT * FROM ({sql})" for sql, _ in parts),
+            [param for _, params in parts for param in params],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _candidate_terms(key, grams, kinds):
+    """
+    Подписи-кандидаты: ключ которых начинается с запроса; с самых
+    редких триграмм запроса, пока их не наберётся MAX_CANDIDATES;
+    если же все триграммы частые — где есть сразу до INTERSECT_GRAMS
+    самых редких из них
+    """
+    frequencies = sorted(
+        (frequency, gram)
+        for gram, frequency in _gram_frequencies(sorted(grams), kinds)
+        if frequency
+    )
+    postings = AutocompleteTrigram.objects.filter(kind__in=kinds).order_by()
+    sources = [
+        AutocompleteTerm.objects.filter(
+            kind__in=kinds, key__gte=key, key__lt=key + "\U0010ffff"
+        )
+        .order_by("kind", "key")
+        .values_list("pk")[:MAX_POSTINGS_PER_GRAM]
+    ]
+    total = 0
+    for frequency, gram in frequencies:
+        if frequency > MAX_POSTINGS_PER_GRAM or total >= MAX_CANDIDATES:
+            break
+        sources.append(
+            postings.filter(gram=gram).values_list("term_id")[:frequency]
+        )
+        total += frequency
+    # Первые по term_id подписи частой триграммы — просто самые старые,
+    # поэтому кандидатов дают подписи, общие для нескольких триграмм;
+    # триграммы чаще FREQUENCY_LIMIT читались бы слишком долго
+    common = [
+        gram
+        for frequency, gram in frequencies[:INTERSECT_GRAMS]
+        if frequency < FREQUENCY_LIMIT
+    ]
+    if common and not total:
+        sources.append(
+            postings.filter(gram__in=common)
+            .values("term_id")
+            .alias(shared=Count("pk"))
+            .filter(shared=len(common))
+            .values_list("term_id")[:MAX_CANDIDATES]
+        )
+    return _union_ids(sources)
+
+
+def suggest(query, kinds=None, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Подсказки для набираемой строки: кандидаты выбираются по самым
+    редким триграммам запроса через индекс (gram, kind) и ранжируются
+    по доле найденных триграмм запроса и сходству Жаккара
+    """
+    key = normalize(query[:MAX_QUERY_LENGTH])
+    grams = trigrams(key, partial=True)
+    if not grams:
+        return []
+    known = dict(AutocompleteTerm.KINDS)
+    kinds = sorted(known.keys() & set(kinds) if kinds else known)
+    if not kinds:
+        return []
+    cache_key = make_key(
+        AUTOCOMPLETE_KEY_PREFIX,
+        (key, kinds, limit),
+        [terms_scope(kind) for kind in kinds],
+    )
+    results = cache.get(cache_key)
+    if results is not None:
+        return results
+
+    # Общие триграммы кандидата считаются по его ключу: триграмма
+    # запроса есть в подписи, если встречается в её словах с отступами
+    threshold = max(1, math.ceil(len(grams) * MIN_SIMILARITY))
+    terms = (
+        AutocompleteTerm.objects.filter(
+            Q(available_from__isnull=True)
+            | Q(available_from__lte=timezone.now()),
+            pk__in=_candidate_terms(key, grams, kinds),
+        )
+        .order_by()
+        .values_list("kind", "object_id", "label", "key", "url", "gram_count")
+    )
+    scored = []
+    for kind, object_id, label, term_key, url, gram_count in terms:
+        padded = "".join(f"  {word} " for word in term_key.split())
+        shared = sum(gram in padded for gram in grams)
+        if shared < threshold:
+            continue
+        scored.append(
+            (
+                shared / len(grams),
+                shared / (len(grams) + gram_count - shared),
+                label,
+                {"kind": kind, "id": object_id, "label": label, "url": url},
+            )
+        )
+    scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+    results = [
+        {**result, "score": round(similarity, 3)}
+        for _, similarity, _, result in scored[:limit]
+    ]
+    cache.set(cache_key, results, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return results
+
+
+def lookup(kind, query, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Подсказки вида kind, ключ которых начинается с query, по алфавиту;
+    префикс превращается в диапазон по индексу (kind, key)
+    """
+    prefix = normalize(query[:MAX_QUERY_LENGTH])
+    cache_key = make_key(
+        AUTOCOMPLETE_KEY_PREFIX, ("lookup", kind, prefix), [terms_scope(kind)]
+    )
+    results = cache.get(cache_key)
+    if results is not None:
+        return results[:limit]
+    terms = AutocompleteTerm.objects.filter(kind=kind)
+    if prefix:
+        terms = terms.filter(key__gte=prefix, key__lt=prefix + "\U0010ffff")
+    results = [
+        {"id": object_id, "label": label}
+        for object_id, label in terms.order_by("key").values_list(
+            "object_id", "label"
+        )[:LOOKUP_CACHE_SIZE]
+    ]
+    cache.set(cache_key, results, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return results[:limit]
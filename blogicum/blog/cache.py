@@ -0,0 +1,247 @@
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core import checks
+from django.core.cache import cache, caches
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+SCOPE_KEY_PREFIX = "blog:scope:"
+COUNT_KEY_PREFIX = "blog:count:"
+PAGE_KEY_PREFIX = "blog:page:"
+COUNT_TIMEOUT = 60
+# Кэши, которые видит только свой процесс: сброс областей в одном
+# процессе не доходит до страниц, закэшированных в другом
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def _scope_key(scope):
+    return f"{SCOPE_KEY_PREFIX}{scope}"
+
+
+def _version_store():
+    # Версии лежат рядом со страницами, которые от них зависят
+    return caches[settings.BLOG_PAGE_CACHE_ALIAS]
+
+
+def stored_versions(*scopes):
+    """Версии областей как в кэше; заведённые заново — со знаком минус"""
+    store = _version_store()
+    keys = {_scope_key(scope): scope for scope in scopes}
+    found = store.get_many(keys)
+    missing = {key: -time.time() for key in keys if key not in found}
+    if missing:
+        store.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[_scope_key(scope)] for scope in scopes]
+
+
+def scope_versions(*scopes):
+    """Возвращает версии областей кэша — моменты их последних изменений"""
+    # Заведённая заново версия для кэша страниц — тоже изменение:
+    # записи, сделанные до неё, могли пережить вытесненную версию
+    return [abs(version) for version in stored_versions(*scopes)]
+
+
+def invalidate(*scopes):
+    """Сбрасывает всё, что закэшировано для перечисленных областей"""
+    _version_store().set_many(
+        {_scope_key(scope): time.time() for scope in scopes}, timeout=None
+    )
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_page_cache(app_configs=None, **kwargs):
+    """Предупреждает, если вне разработки кэш страниц не общий для процессов"""
+    if settings.DEBUG and settings.BLOG_DB_PROFILE != "production":
+        return []
+    if not settings.BLOG_PAGE_CACHE_TIMEOUT:
+        return []
+    alias = settings.BLOG_PAGE_CACHE_ALIAS
+    backend = settings.CACHES[alias]["BACKEND"]
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [
+        checks.Warning(
+            f"Кэш {alias} ({backend}) виден только своему процессу",
+            hint=(
+                "Укажите в CACHES общий кэш, например Redis или Memcached,"
+                " или отключите кэш страниц: BLOG_PAGE_CACHE_TIMEOUT = 0"
+            ),
+            id="blog.W002",
+        )
+    ]
+
+
+def make_key(prefix, parts, scopes=()):
+    """Ключ кэша из произвольных частей и текущих версий областей"""
+    raw = repr((tuple(parts), scope_versions(*scopes)))
+    return prefix + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cached_count(count_key, scopes, compute):
+    """Количество объектов для данного набора фильтров из кэша"""
+    key = make_key(COUNT_KEY_PREFIX, count_key, scopes)
+    count = cache.get(key)
+    if count is None:
+        count = compute()
+        cache.set(key, count, COUNT_TIMEOUT)
+    return count
+
+
+def post_scopes(post):
+    """Области, от которых зависит страница публикации"""
+    return (
+        f"post:{post.pk}",
+        f"category:{post.category_id}",
+        f"author:{post.author_id}",
+        f"location:{post.location_id}",
+    )
+
+
+def add_cache_scopes(request, *scopes):
+    """Отмечает, от каких данных зависит ответ на запрос"""
+    request.cache_scopes = (*getattr(request, "cache_scopes", ()), *scopes)
+
+
+def expire_page_at(request, moment):
+    """Отмечает, что ответ устареет к моменту moment (секунды эпохи)"""
+    if moment is not None:
+        request.cache_expires = min(
+            moment, getattr(request, "cache_expires", moment)
+        )
+
+
+def latest_publication(posts):
+    """Время последней наступившей публикации ленты posts или None"""
+    latest = posts.order_by().aggregate(latest=Max("pub_date"))["latest"]
+    return latest.timestamp() if latest is not None else None
+
+
+def page_validators(request, feed=None):
+    """ETag и Last-Modified страницы по версиям её областей и ленте feed"""
+    versions = scope_versions(*getattr(request, "cache_scopes", ()))
+    if feed is not None:
+        published = latest_publication(feed)
+        if published is not None:
+            versions.append(published)
+    user = request.user.pk if request.user.is_authenticated else None
+    raw = repr((request.get_full_path(), user, versions))
+    etag = f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+    return etag, int(max(versions, default=time.time()))
+
+
+def not_modified(request, feed=None):
+    """Ответ 304, если у клиента актуальная версия страницы, иначе None"""
+    if request.method not in ("GET", "HEAD") or get_messages(request):
+        return None
+    request.page_validators = page_validators(request, feed)
+    etag, last_modified = request.page_validators
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def skip_page_cache(request):
+    """Отмечает, что ответ нельзя кэшировать и снабжать валидаторами"""
+    request.skip_page_cache = True
+
+
+def conditional_page(view):
+    """Добавляет к ответу view валидаторы, вычисленные в not_modified"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        validators = getattr(request, "page_validators", None)
+        if (
+            validators is not None
+            and response.status_code == 200
+            and not getattr(request, "skip_page_cache", False)
+        ):
+            etag, last_modified = validators
+            response.headers.setdefault("ETag", etag)
+            response.headers.setdefault(
+                "Last-Modified", http_date(last_modified)
+            )
+            patch_vary_headers(response, ("Cookie",))
+        return response
+
+    return wrapper
+
+
+def _page_is_fresh(started, scopes):
+    """Страница актуальна, если её области не менялись с начала отрисовки"""
+    return max(scope_versions(*scopes)) < started
+
+
+def cache_anonymous_page(view):
+    """Кэширует страницы для анонимных посетителей до изменения их областей"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.BLOG_PAGE_CACHE_TIMEOUT
+        if (
+            not timeout
+            or request.method not in ("GET", "HEAD")
+            or request.user.is_authenticated
+            or get_messages(request)
+        ):
+            return view(request, *args, **kwargs)
+
+        store = caches[settings.BLOG_PAGE_CACHE_ALIAS]
+        key = (
+            PAGE_KEY_PREFIX
+            + hashlib.md5(request.get_full_path().encode()).hexdigest()
+        )
+        entry = store.get(key)
+        if entry is not None and _page_is_fresh(entry[0], entry[1]):
+            response = entry[2]
+            return get_conditional_response(
+                request,
+                etag=response.get("ETag"),
+                last_modified=(
+                    parse_http_date_safe(response["Last-Modified"])
+                    if response.has_header("Last-Modified")
+                    else None
+                ),
+                response=response,
+            )
+
+        started = time.time()
+        response = view(request, *args, **kwargs)
+        scopes = getattr(request, "cache_scopes", ())
+        if (
+            request.method != "GET"
+            or not scopes
+            or response.status_code != 200
+            or response.streaming
+            or response.cookies
+            or getattr(request, "skip_page_cache", False)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Cookie",))
+
+        expires = getattr(request, "cache_expires", None)
+        if expires is not None:
+            timeout = min(timeout, max(math.ceil(expires - started), 1))
+
+        def store_response(response):
+            store.set(key, (started, scopes, response), timeout)
+
+        if callable(getattr(response, "render", None)):
+            response.add_post_render_callback(store_response)
+        else:
+            store_response(response)
+        return response
+
+    return wrapper
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core import checks
+from django.db import connections
+
+# Значения, которые PRAGMA возвращает в другом виде, чем задаются
+SYNCHRONOUS = {"0": "OFF", "1": "NORMAL", "2": "FULL", "3": "EXTRA"}
+TEMP_STORE = {"0": "DEFAULT", "1": "FILE", "2": "MEMORY"}
+REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "busy_timeout",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+)
+
+
+def apply_pragmas(connection, pragmas=None):
+    """Настраивает новое соединение SQLite значениями BLOG_SQLITE_PRAGMAS"""
+    if pragmas is None:
+        pragmas = settings.BLOG_SQLITE_PRAGMAS
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def _normalize(name, value):
+    value = str(value).upper()
+    if name == "synchronous":
+        return SYNCHRONOUS.get(value, value)
+    if name == "temp_store":
+        return TEMP_STORE.get(value, value)
+    return value
+
+
+def active_pragmas(connection, names=REPORTED_PRAGMAS):
+    """Действующие значения настроек SQLite для соединения"""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = _normalize(name, row[0] if row else None)
+    return values
+
+
+@checks.register(checks.Tags.database)
+def check_sqlite_settings(app_configs=None, databases=None, **kwargs):
+    """
+    Сообщает профиль базы и действующие настройки SQLite и предупреждает,
+    если они разошлись с BLOG_SQLITE_PRAGMAS, например когда файловая
+    система не поддерживает WAL
+    """
+    messages = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if connection.vendor != "sqlite":
+            continue
+        active = active_pragmas(
+            connection, {*REPORTED_PRAGMAS, *settings.BLOG_SQLITE_PRAGMAS}
+        )
+        persistent = connection.settings_dict["CONN_MAX_AGE"]
+        messages.append(
+            checks.Info(
+                f"База {alias}: профиль {settings.BLOG_DB_PROFILE},"
+                f" CONN_MAX_AGE={persistent}, "
+                + ", ".join(
+                    f"{name}={active[name]}" for name in REPORTED_PRAGMAS
+                ),
+                id="blog.I001",
+            )
+        )
+        for name, expected in settings.BLOG_SQLITE_PRAGMAS.items():
+            if active[name] != _normalize(name, expected):
+                messages.append(
+                    checks.Warning(
+                        f"База {alias}: PRAGMA {name} = {active[name]},"
+                        f" а в настройках {expected}",
+                        id="blog.W001",
+                    )
+                )
+    return messages
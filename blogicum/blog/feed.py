@@ -0,0 +1,68 @@
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import FeedEntry, Post
+from .pagination import FEED_ORDERING
+
+FEED_FIELDS = ("pub_date", "category_id", "author_id")
+BATCH_SIZE = 500
+
+
+def _entries(posts):
+    for row in posts.values("pk", *FEED_FIELDS).iterator():
+        yield FeedEntry(
+            post_id=row["pk"], **{name: row[name] for name in FEED_FIELDS}
+        )
+
+
+def sync_feed(posts):
+    """
+    Приводит записи ленты для переданных публикаций в соответствие
+    с их текущим состоянием: видимые добавляет или обновляет,
+    скрытые удаляет
+    """
+    FeedEntry.objects.filter(
+        post__in=posts.filter(is_visible=False).values("pk")
+    ).delete()
+    FeedEntry.objects.bulk_create(
+        _entries(posts.filter(is_visible=True).order_by()),
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=("post",),
+        update_fields=FEED_FIELDS,
+    )
+
+
+def rebuild_feed(batch_size=BATCH_SIZE):
+    """Полностью пересобирает ленту из таблицы публикаций по частям"""
+    FeedEntry.objects.all().delete()
+    visible = Post.objects.filter(is_visible=True).order_by("pk")
+    last_pk = 0
+    total = 0
+    while True:
+        batch = list(_entries(visible.filter(pk__gt=last_pk)[:batch_size]))
+        if not batch:
+            return total
+        FeedEntry.objects.bulk_create(batch)
+        last_pk = batch[-1].post_id
+        total += len(batch)
+
+
+def get_feed_queryset():
+    """Опубликованные к текущему моменту записи ленты"""
+    return (
+        FeedEntry.objects.filter(pub_date__lte=timezone.now())
+        .only("pk", "pub_date")
+        .order_by(*FEED_ORDERING)
+    )
+
+
+def next_feed_publication():
+    """
+    Время ближайшей отложенной публикации ленты в секундах эпохи
+    или None; к этому моменту закэшированные ленты устаревают
+    """
+    upcoming = FeedEntry.objects.filter(pub_date__gt=timezone.now()).aggregate(
+        upcoming=Min("pub_date")
+    )["upcoming"]
+    return upcoming.timestamp() if upcoming is not None else None
@@ -1,9 +1,23 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from django.urls import reverse_lazy
+from PIL import Image
 
-from blog.models import Comment, Page, Post
+from blog.images import recompress
+from blog.models import AutocompleteTerm, Comment, Page, Post
+from blog.uploads import find_upload, open_upload
+from blog.widgets import AutocompleteSelect
 
 
 class PostForm(forms.ModelForm):
+    upload = forms.CharField(
+        required=False,
+        widget=forms.HiddenInput(
+            attrs={"data-upload-url": reverse_lazy("blog:uploads")}
+        ),
+        help_text="Токен изображения, загруженного по частям",
+    )
+
     class Meta:
         model = Post
         fields = (
@@ -19,8 +33,75 @@ class PostForm(forms.ModelForm):
             "pub_date": forms.DateTimeInput(
                 attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"
             ),
+            "location": AutocompleteSelect(AutocompleteTerm.LOCATION),
+            "category": AutocompleteSelect(AutocompleteTerm.CATEGORY),
         }
 
+    class Media:
+        js = ("js/uploads.js",)
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.upload_session = self.upload_file = None
+
+    def clean_image(self):
+        """Новая загрузка пережимается до сохранения"""
+        return self.process_image(self.cleaned_data.get("image"))
+
+    def clean(self):
+        """Изображение, загруженное по частям, подставляется по токену"""
+        cleaned_data = super().clean()
+        token = cleaned_data.get("upload")
+        if not token or isinstance(cleaned_data.get("image"), UploadedFile):
+            return cleaned_data
+        session = find_upload(self.user, token)
+        if session is None:
+            self.add_error("upload", "Загрузка не найдена или не завершена")
+            return cleaned_data
+        self.upload_file = open_upload(session)
+        try:
+            image = self.fields["image"].clean(self.upload_file)
+            cleaned_data["image"] = self.process_image(image)
+        except forms.ValidationError as error:
+            self.add_error("upload", error)
+        else:
+            self.upload_session = session
+        finally:
+            # Файл загрузки нужен до сохранения, только если он и станет
+            # изображением публикации, а не пережат в новый
+            if cleaned_data.get("image") is not self.upload_file:
+                self.close_upload()
+        return cleaned_data
+
+    def full_clean(self):
+        super().full_clean()
+        if self._errors:
+            # Публикация не будет сохранена, файл загрузки не нужен
+            self.close_upload()
+
+    def close_upload(self):
+        if self.upload_file is not None:
+            self.upload_file.close()
+            self.upload_file = None
+
+    def finish_upload(self):
+        """Удаляет загрузку по частям, когда публикация сохранена"""
+        if self.upload_session is not None:
+            self.close_upload()
+            self.upload_session.delete()
+            self.upload_session = None
+
+    def process_image(self, image):
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            processed = recompress(image)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise forms.ValidationError("Не удалось обработать изображение")
+        self.instance._image_original_size = image.size
+        return image if processed is None else processed
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
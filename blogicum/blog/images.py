@@ -0,0 +1,290 @@
+import base64
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from PIL import Image, ImageOps
+
+from .models import ImageBlob, Post
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow без littlecms: профиль CMYK просто отбрасывается
+    ImageCms = None
+
+VARIANT_WIDTHS = (320, 640, 1280)
+# Формат Pillow и расширение файла
+VARIANT_FORMATS = (("jpeg", "jpg"), ("webp", "webp"))
+VARIANT_QUALITY = 80
+VARIANT_DIR = "post_images/variants"
+LQIP_SIZE = 16
+LQIP_QUALITY = 40
+# Сведения о снимке и камере, которые не нужны для показа
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+# Ориентации EXIF, при которых ширина и высота меняются местами
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+# Цветовое пространство режимов Pillow: встроенный профиль подходит
+# сохранённому файлу, только если пространство не поменялось
+COLOR_SPACES = {
+    "RGB": "RGB",
+    "RGBA": "RGB",
+    "P": "RGB",
+    "PA": "RGB",
+    "L": "L",
+    "LA": "L",
+    "1": "L",
+    "CMYK": "CMYK",
+}
+
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def open_image(file, max_width):
+    """
+    Открывает изображение с учётом ориентации из EXIF; JPEG
+    декодируется в режиме draft сразу в уменьшенном в 2–8 раз масштабе,
+    но не уже max_width
+    Возвращает изображение RGB и исходные ширину и высоту
+    """
+    image = Image.open(file)
+    width, height = image.size
+    transposed = image.getexif().get(0x0112, 1) in TRANSPOSED_ORIENTATIONS
+    if transposed:
+        width, height = height, width
+    if image.format == "JPEG" and width > max_width:
+        scaled = (max_width, max(1, height * max_width // width))
+        image.draft("RGB", scaled[::-1] if transposed else scaled)
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    return image, width, height
+
+
+def cmyk_to_srgb(image, icc_profile):
+    """
+    Переводит CMYK-изображение в sRGB по его встроенному профилю;
+    если профиль не читается, цвета переводит обычный convert()
+    """
+    if ImageCms is None:
+        return image
+    try:
+        return ImageCms.profileToProfile(
+            image,
+            ImageCms.ImageCmsProfile(io.BytesIO(icc_profile)),
+            ImageCms.createProfile("sRGB"),
+            outputMode="RGB",
+        )
+    except (ImageCms.PyCMSError, OSError):
+        return image
+
+
+def recompress(file):
+    """
+    Пережимает изображение за один проход Pillow: поворачивает по EXIF,
+    уменьшает до BLOG_IMAGE_MAX_SIZE по большей стороне и сохраняет
+    с качеством BLOG_IMAGE_QUALITY без метаданных, но с цветовым профилем,
+    если он подходит результату; CMYK переводится в sRGB
+    Прозрачные изображения сохраняются в PNG, серые — в сером JPEG,
+    остальные — в JPEG
+    Возвращает загружаемый файл или None, если исходный не хуже
+    """
+    max_size = settings.BLOG_IMAGE_MAX_SIZE
+    file.seek(0)
+    image = Image.open(file)
+    if getattr(image, "is_animated", False):
+        return None
+    exif = image.getexif()
+    changed = bool(exif) or any(key in image.info for key in METADATA_KEYS)
+    icc_profile = image.info.get("icc_profile")
+    scale = max_size / max(image.size)
+    if scale < 1:
+        changed = True
+        if image.format == "JPEG":
+            image.draft(
+                "RGB",
+                (round(image.width * scale), round(image.height * scale)),
+            )
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(
+        (max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=3.0
+    )
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        mode = "RGBA"
+        extension, options = "png", {"format": "PNG", "optimize": True}
+    else:
+        mode = "L" if image.mode == "L" else "RGB"
+        extension, options = "jpg", {
+            "format": "JPEG",
+            "quality": settings.BLOG_IMAGE_QUALITY,
+            "optimize": True,
+            "progressive": True,
+        }
+    if icc_profile and COLOR_SPACES.get(image.mode) != COLOR_SPACES[mode]:
+        # Профиль исходного пространства, например CMYK, не подходит
+        # результату; браузеры считают файл без профиля файлом в sRGB
+        if image.mode == "CMYK":
+            image = cmyk_to_srgb(image, icc_profile)
+        icc_profile = None
+    image = image.convert(mode)
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    if not changed and buffer.tell() >= file.size:
+        return None
+    root = posixpath.splitext(posixpath.basename(file.name))[0]
+    return SimpleUploadedFile(
+        f"{root}.{extension}",
+        buffer.getvalue(),
+        Image.MIME[options["format"]],
+    )
+
+
+def encode(image, fmt, quality=VARIANT_QUALITY):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def placeholder(image):
+    """Крошечная копия изображения в виде data URI для заглушки"""
+    tiny = image.copy()
+    tiny.thumbnail((LQIP_SIZE, LQIP_SIZE))
+    data = base64.b64encode(encode(tiny, "jpeg", LQIP_QUALITY)).decode()
+    return f"data:image/jpeg;base64,{data}"
+
+
+def image_root(source):
+    """Имя файла без каталога и расширения — общая основа имён вариантов"""
+    return posixpath.splitext(posixpath.basename(source))[0]
+
+
+def _variant_dir(source):
+    root = image_root(source)
+    return root, f"{VARIANT_DIR}/{root[:2]}"
+
+
+def variant_name(source, width, extension):
+    """
+    Имя варианта зависит только от имени оригинала, поэтому у одного
+    файла, на который ссылаются несколько публикаций, варианты общие
+    """
+    root, directory = _variant_dir(source)
+    return f"{directory}/{root}-{width}.{extension}"
+
+
+def render_variants(storage, source):
+    """
+    Читает изображение source из storage, сохраняет его уменьшенные
+    копии нужных ширин во всех форматах и возвращает их описание
+    для Post.image_meta
+    """
+    with storage.open(source) as file:
+        image, width, height = open_image(file, max(VARIANT_WIDTHS))
+    variants = {fmt: [] for fmt, _ in VARIANT_FORMATS}
+    for variant_width in sorted({min(w, width) for w in VARIANT_WIDTHS}):
+        resized = image.resize(
+            (variant_width, max(1, round(height * variant_width / width))),
+            Image.Resampling.LANCZOS,
+            reducing_gap=3.0,
+        )
+        for fmt, extension in VARIANT_FORMATS:
+            name = variant_name(source, variant_width, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            name = default_storage.save(
+                name, ContentFile(encode(resized, fmt))
+            )
+            variants[fmt].append([variant_width, name])
+    return {
+        "source": source,
+        "width": width,
+        "height": height,
+        "lqip": placeholder(image),
+        "variants": variants,
+    }
+
+
+def generate_variants(post_id):
+    """
+    Готовит варианты изображения публикации; если за это время
+    изображение заменили, результат отбрасывается
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return None
+    source = post.image.name
+    try:
+        meta = render_variants(post.image.storage, source)
+    except (OSError, Image.DecompressionBombError, ValueError):
+        logger.warning("Не удалось обработать %s", source, exc_info=True)
+        return None
+    if not Post.objects.filter(pk=post_id, image=source).exists():
+        return None
+    post.image_meta = meta
+    post.save(update_fields=["image_meta"])
+    return meta
+
+
+def _run(post_id):
+    close_old_connections()
+    try:
+        generate_variants(post_id)
+    except Exception:
+        logger.exception("Ошибка при подготовке вариантов %s", post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(post_id):
+    """
+    Ставит подготовку вариантов в фоновый пул потоков после фиксации
+    транзакции, чтобы не задерживать ответ на запрос
+    """
+    global _executor
+    if not settings.BLOG_IMAGE_VARIANTS:
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BLOG_IMAGE_WORKERS,
+            thread_name_prefix="post-images",
+        )
+    transaction.on_commit(lambda: _executor.submit(_run, post_id))
+
+
+def acquire_image(name, size=0, original_size=None):
+    """
+    Учитывает новую ссылку публикации на файл изображения;
+    original_size — размер загрузки до обработки
+    """
+    ImageBlob.objects.get_or_create(
+        name=name, defaults={"size": size, "original_size": original_size}
+    )
+    ImageBlob.objects.filter(name=name).update(ref_count=F("ref_count") + 1)
+
+
+def release_image(name):
+    """
+    Снимает ссылку на файл; учёт файла без ссылок удаляется, а сам файл
+    с вариантами убирает collect_media_garbage, когда файл постареет:
+    тот же файл могла только что переиспользовать ещё не сохранённая
+    загрузка с тем же содержимым
+    """
+    ImageBlob.objects.filter(name=name).update(
+        ref_count=Greatest(F("ref_count") - 1, 0)
+    )
+    ImageBlob.objects.filter(name=name, ref_count=0).delete()
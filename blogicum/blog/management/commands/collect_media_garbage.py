@@ -0,0 +1,98 @@
+import json
+import os
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.media_gc import BATCH_SIZE, MIN_AGE, Progress, collect
+from blog.storage import image_storage
+
+STATE_FILE = ".media_gc.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет изображения публикаций, на которые не ссылается ни одна"
+        " публикация; прерванный проход продолжается с места остановки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, какие файлы были бы удалены",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=200,
+            help="Не больше стольких операций с файлами в секунду, 0 — без"
+            " ограничения",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=MIN_AGE,
+            help="Не трогать файлы моложе стольких секунд",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Количество файлов, проверяемых за один шаг",
+        )
+        parser.add_argument(
+            "--state",
+            help="Файл с прогрессом прохода, по умолчанию"
+            f" {STATE_FILE} в MEDIA_ROOT",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Начать проход заново, не глядя на сохранённый прогресс",
+        )
+
+    def handle(
+        self, *args, dry_run, rate, min_age, batch_size, state, restart, **opts
+    ):
+        if batch_size < 1:
+            raise CommandError("--batch-size должен быть положительным")
+        state = state or image_storage.path(STATE_FILE)
+        progress = Progress()
+        # Пробный проход не меняет файлов, и продолжать его незачем
+        if not dry_run and not restart and os.path.exists(state):
+            with open(state) as file:
+                progress = Progress(**json.load(file))
+            self.stdout.write(f"Продолжение после {progress.last}")
+
+        def report(name, size):
+            if dry_run or opts["verbosity"] > 1:
+                self.stdout.write(f"{name} ({size} байт)")
+
+        def save(progress):
+            if dry_run:
+                return
+            temp = f"{state}.tmp"
+            with open(temp, "w") as file:
+                json.dump(asdict(progress), file)
+            os.replace(temp, state)
+
+        collect(
+            image_storage,
+            progress,
+            dry_run=dry_run,
+            min_age=min_age,
+            rate=rate,
+            batch_size=batch_size,
+            on_orphan=report,
+            on_batch=save,
+        )
+        if not dry_run and os.path.exists(state):
+            os.remove(state)
+        verb = "Будет удалено" if dry_run else "Удалено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проверено файлов: {progress.scanned}. {verb}:"
+                f" {progress.orphans}, {progress.freed} байт"
+            )
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import generate_variants
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Готовит уменьшенные копии изображений публикаций, для которых"
+        " их ещё нет"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересоздать варианты для всех изображений",
+        )
+
+    def handle(self, *args, all, **options):
+        posts = Post.objects.exclude(image="").exclude(image=None)
+        if not all:
+            posts = posts.filter(image_meta={})
+        done = failed = 0
+        for post_id in posts.order_by("pk").values_list("pk", flat=True):
+            if generate_variants(post_id) is None:
+                failed += 1
+            else:
+                done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Обработано: {done}, с ошибками: {failed}")
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.autocomplete import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает триграммный индекс подсказок по заголовкам"
+        " публикаций, именам пользователей и категориям"
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Подсказок в индексе: {total}"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.feed import BATCH_SIZE, rebuild_feed
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованную ленту публикаций с нуля"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Количество записей, добавляемых одним запросом",
+        )
+
+    def handle(self, *args, batch_size, **options):
+        with transaction.atomic():
+            total = rebuild_feed(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Записей в ленте: {total}"))
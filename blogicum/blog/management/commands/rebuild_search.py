@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.search import is_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовые индексы публикаций и комментариев"
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError(
+                "Полнотекстовый индекс доступен только в SQLite"
+            )
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс перестроен"))
@@ -0,0 +1,73 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from PIL import Image
+
+from blog.images import recompress
+from blog.models import ImageBlob, Post
+from blog.storage import image_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Пережимает уже загруженные изображения публикаций так же, как"
+        " новые загрузки, и печатает отчёт об экономии"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать экономию, ничего не меняя",
+        )
+
+    def handle(self, *args, dry_run, **options):
+        before = after = processed = failed = 0
+        blobs = ImageBlob.objects.filter(original_size__isnull=True)
+        for blob in blobs.order_by("pk").iterator():
+            try:
+                with image_storage.open(blob.name) as file:
+                    upload = recompress(File(file, name=blob.name))
+            except (OSError, ValueError, Image.DecompressionBombError):
+                failed += 1
+                self.stderr.write(f"{blob.name}: не удалось обработать")
+                continue
+            processed += 1
+            before += blob.size
+            if upload is None:
+                after += blob.size
+                if not dry_run:
+                    blobs.filter(pk=blob.pk).update(original_size=F("size"))
+                continue
+            after += upload.size
+            self.stdout.write(f"{blob.name}: {blob.size} → {upload.size} байт")
+            if not dry_run:
+                self.replace(blob, upload)
+        saved = before - after
+        percent = saved * 100 // before if before else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано: {processed}, с ошибками: {failed}."
+                f" Было {before} байт, стало {after},"
+                f" экономия {saved} ({percent}%)"
+            )
+        )
+
+    @staticmethod
+    def replace(blob, upload):
+        """
+        Переводит публикации на пережатый файл через обычное сохранение,
+        чтобы сработали счётчики ссылок, варианты и сброс кэшей
+        """
+        posts = Post.objects.filter(image=blob.name)
+        field = Post._meta.get_field("image")
+        with transaction.atomic():
+            name = image_storage.save(
+                field.generate_filename(None, upload.name), upload
+            )
+            for post in posts:
+                post.image = name
+                post._image_original_size = blob.size
+                post.save(update_fields=["image"])
+            ImageBlob.objects.filter(name=name).update(original_size=blob.size)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from blog.models import Comment, Post
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Сверяет счётчики комментариев публикаций и исправляет расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Количество публикаций, проверяемых за одну транзакцию",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только вывести расхождения, ничего не изменяя",
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        last_pk = 0
+        checked = fixed = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+            with transaction.atomic():
+                drifted = list(
+                    Post.objects.filter(pk__in=batch)
+                    .annotate(actual=Count("comments"))
+                    .exclude(comment_count=F("actual"))
+                    .values_list("pk", "comment_count", "actual")
+                )
+                for pk, stored, actual in drifted:
+                    self.stdout.write(f"Публикация {pk}: {stored} -> {actual}")
+                fixed += len(drifted)
+                if drifted and not dry_run:
+                    Post.objects.filter(
+                        pk__in=[pk for pk, _, _ in drifted]
+                    ).recount_comments()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проверено публикаций: {checked}, " f"расхождений: {fixed}"
+            )
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import invalidate, post_scopes
+from blog.models import Post, next_version
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Заново готовит анонсы и HTML текста публикаций"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Количество публикаций, обновляемых одним запросом",
+        )
+
+    def handle(self, *args, batch_size, **options):
+        last_pk = 0
+        rendered = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .only("pk", "text", "category", "author", "location")
+                .order_by("pk")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for post in batch:
+                post.render_text()
+                # bulk_update не вызывает save(): версия карточки
+                # и страницы с публикациями обновляются здесь
+                post.version = next_version()
+            Post.objects.bulk_update(
+                batch, ("excerpt", "text_html", "version")
+            )
+            invalidate(
+                "index",
+                *{scope for post in batch for scope in post_scopes(post)},
+            )
+            rendered += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f"Обработано публикаций: {rendered}")
+        )
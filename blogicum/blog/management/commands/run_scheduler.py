@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.scheduler import last_run, next_publication, publish_due_posts
+
+DEFAULT_POLL_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Выпускает отложенные публикации точно в момент pub_date "
+        "и сбрасывает кэши лент"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выпустить наступившие публикации и завершиться (для cron)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=DEFAULT_POLL_INTERVAL,
+            help=(
+                "Максимальная пауза между проверками, с; за это время "
+                "замечаются новые отложенные публикации"
+            ),
+        )
+
+    def handle(self, *args, once, poll_interval, **options):
+        since = last_run()
+        while True:
+            now = timezone.now()
+            for post in publish_due_posts(since, now):
+                self.stdout.write(
+                    f"Опубликовано: {post} ({post.pub_date:%Y-%m-%d %H:%M})"
+                )
+            since = now
+            if once:
+                return
+            upcoming = next_publication(now)
+            delay = poll_interval
+            if upcoming is not None:
+                until_upcoming = (upcoming - timezone.now()).total_seconds()
+                delay = min(delay, max(until_upcoming, 0))
+            try:
+                time.sleep(delay)
+            except KeyboardInterrupt:
+                return
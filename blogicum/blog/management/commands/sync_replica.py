@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.replicas import sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в файлы реплик через backup API;"
+        " заменяет репликацию при локальной проверке чтения из реплик"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "aliases",
+            nargs="*",
+            help="Реплики из DATABASES, по умолчанию BLOG_READ_REPLICAS",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Повторять копирование с такой паузой, с",
+        )
+
+    def handle(self, *args, aliases, interval, **options):
+        aliases = aliases or settings.BLOG_READ_REPLICAS
+        if not aliases:
+            raise CommandError("Реплики не настроены")
+        for alias in aliases:
+            if alias not in settings.BLOG_READ_REPLICAS:
+                raise CommandError(f"{alias} не указана в BLOG_READ_REPLICAS")
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(f"{alias} — не SQLite")
+        while True:
+            for alias in aliases:
+                started = time.monotonic()
+                sync_replica(alias)
+                self.stdout.write(
+                    f"{alias}: скопирована за"
+                    f" {time.monotonic() - started:.2f} с"
+                )
+            if interval is None:
+                return
+            time.sleep(interval)
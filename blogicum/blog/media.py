@@ -0,0 +1,168 @@
+import os
+import posixpath
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import TEMP_SUFFIX
+
+# Имя из хэша содержимого никогда не меняет смысла
+HASHED_NAME = re.compile(r"(?:^|/)[0-9a-f]{64}\.\w+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag(name, status):
+    if HASHED_NAME.search(name):
+        return f'"{posixpath.splitext(posixpath.basename(name))[0]}"'
+    return f'"{status.st_mtime_ns:x}-{status.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Границы одного диапазона байтов из заголовка Range включительно;
+    None — отдать файл целиком, ValueError — диапазон вне файла
+    Несколько диапазонов сразу не поддерживаются, и для них файл
+    отдаётся целиком, как разрешает RFC 9110
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if not length:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last or first >= size:
+        raise ValueError(header)
+    return first, last
+
+
+def _if_range_matches(request, etag, mtime):
+    """Диапазон отдаётся, только если файл не менялся с If-Range"""
+    value = request.headers.get("If-Range")
+    if value is None:
+        return True
+    if value.startswith(('"', "W/")):
+        return value == etag
+    date = parse_http_date_safe(value)
+    return date is not None and int(mtime) <= date
+
+
+class _RangeFile:
+    """
+    Файл, открытый с позиции first и читаемый не дальше length байт;
+    fileno остаётся у файла, и wsgi.file_wrapper сервера отдаёт
+    диапазон через sendfile с текущей позиции
+    """
+
+    def __init__(self, path, first, length):
+        self.name = path
+        self.file = open(path, "rb")
+        self.file.seek(first)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        chunk = self.file.read(size)
+        self.remaining -= len(chunk)
+        return chunk
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _sendfile_response(name, path):
+    response = HttpResponse()
+    # Тип содержимого определит фронтовый сервер
+    del response.headers["Content-Type"]
+    if settings.BLOG_MEDIA_SENDFILE == "x-accel-redirect":
+        response.headers["X-Accel-Redirect"] = (
+            settings.BLOG_MEDIA_ACCEL_PREFIX + name
+        )
+    else:
+        response.headers["X-Sendfile"] = path
+    return response
+
+
+def _file_response(request, path, status, etag):
+    size = status.st_size
+    content_range = None
+    header = request.headers.get("Range")
+    if header and _if_range_matches(request, etag, status.st_mtime):
+        try:
+            content_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+    if content_range is None:
+        response = FileResponse(open(path, "rb"))
+    else:
+        first, last = content_range
+        response = FileResponse(
+            _RangeFile(path, first, last - first + 1), status=206
+        )
+        response.headers["Content-Length"] = last - first + 1
+        response.headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Отдаёт файл из MEDIA_ROOT: с проверкой ETag и Last-Modified,
+    диапазонами байтов и долгим кэшированием имён из хэша содержимого
+    Тело, и целиком, и диапазоном, отдаётся через wsgi.file_wrapper
+    (sendfile), а при BLOG_MEDIA_SENDFILE файл вместе с обработкой Range
+    передаётся фронтовому серверу заголовком
+    """
+    name = posixpath.normpath(path).lstrip("/")
+    basename = posixpath.basename(name)
+    # Служебные и недокачанные файлы наружу не отдаются
+    if basename.startswith(".") or basename.endswith(TEMP_SUFFIX):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+        status = os.stat(full_path)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404
+    if not stat.S_ISREG(status.st_mode):
+        raise Http404
+
+    etag = _etag(name, status)
+    last_modified = int(status.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if settings.BLOG_MEDIA_SENDFILE:
+            response = _sendfile_response(name, full_path)
+        else:
+            response = _file_response(request, full_path, status, etag)
+            if response.status_code == 416:
+                return response
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    if HASHED_NAME.search(name):
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers["Cache-Control"] = (
+            f"public, max-age={settings.BLOG_MEDIA_MAX_AGE}"
+        )
+    return response
@@ -0,0 +1,250 @@
+import heapq
+import itertools
+import os
+import posixpath
+import time
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from .images import VARIANT_DIR, image_root
+from .models import ImageBlob, Post
+
+MEDIA_DIR = "post_images"
+BATCH_SIZE = 1000
+# Файл моложе этого возраста может принадлежать ещё не сохранённой
+# публикации или незавершённой загрузке (временному файлу .part)
+MIN_AGE = 60 * 60
+PREFIX_END = "\U0010ffff"
+ROOTS_PER_QUERY = 100
+
+
+@dataclass
+class Progress:
+    """Состояние прохода; last — последнее обработанное имя файла"""
+
+    last: str = ""
+    scanned: int = 0
+    orphans: int = 0
+    freed: int = 0
+
+
+class SortedCursor:
+    """Проход по возрастающему потоку имён навстречу другому такому же"""
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.current = next(iterator, None)
+
+    def contains(self, name):
+        while self.current is not None and self.current < name:
+            self.current = next(self.iterator, None)
+        return self.current == name
+
+
+class Throttle:
+    """Ограничивает число операций с файлами в секунду"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next > now:
+            time.sleep(self.next - now)
+        self.next = max(now, self.next) + self.interval
+
+
+def iter_files(storage, directory, start_after=""):
+    """
+    Имена файлов под directory по возрастанию, начиная после start_after
+    Каталоги читаются по одному, и к каждому добавляется «/», чтобы
+    порядок обхода совпадал с порядком строк в базе
+    """
+    try:
+        with os.scandir(storage.path(directory)) as scan:
+            entries = sorted(
+                f"{entry.name}/" if entry.is_dir() else entry.name
+                for entry in scan
+            )
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        name = f"{directory}/{entry}"
+        if not entry.endswith("/"):
+            if name > start_after:
+                yield name
+        elif name > start_after or start_after.startswith(name):
+            yield from iter_files(storage, name[:-1], start_after)
+
+
+def _keyset(queryset, field, start_after, batch_size):
+    last = start_after
+    while True:
+        names = list(
+            queryset.filter(**{f"{field}__gt": last})
+            .order_by(field)
+            .values_list(field, flat=True)
+            .distinct()[:batch_size]
+        )
+        yield from names
+        if len(names) < batch_size:
+            return
+        last = names[-1]
+
+
+def iter_references(start_after="", batch_size=BATCH_SIZE):
+    """
+    Имена файлов, на которые ссылаются публикации и счётчики ссылок,
+    по возрастанию и без повторов; читаются по индексам порциями
+    """
+    previous = None
+    for name in heapq.merge(
+        _keyset(Post.objects.all(), "image", start_after, batch_size),
+        _keyset(ImageBlob.objects.all(), "name", start_after, batch_size),
+    ):
+        if name != previous:
+            previous = name
+            yield name
+
+
+def referenced(names):
+    """Какие из имён names упоминаются в базе"""
+    return set(
+        Post.objects.filter(image__in=names).values_list("image", flat=True)
+    ) | set(
+        ImageBlob.objects.filter(name__in=names).values_list("name", flat=True)
+    )
+
+
+def live_roots(roots):
+    """
+    Какие из основ имён roots принадлежат упомянутым в базе оригиналам,
+    то есть чьи варианты ещё нужны; префиксы ищутся диапазонами по индексам
+    """
+    roots = sorted(roots)
+    found = set()
+    for start in range(0, len(roots), ROOTS_PER_QUERY):
+        prefixes = [
+            prefix
+            for root in roots[start : start + ROOTS_PER_QUERY]
+            for prefix in (
+                f"{MEDIA_DIR}/{root[:2]}/{root}.",
+                f"{MEDIA_DIR}/{root}.",
+            )
+        ]
+        for queryset, field in (
+            (Post.objects.all(), "image"),
+            (ImageBlob.objects.all(), "name"),
+        ):
+            condition = reduce(
+                or_,
+                (
+                    Q(
+                        **{
+                            f"{field}__gte": prefix,
+                            f"{field}__lt": prefix + PREFIX_END,
+                        }
+                    )
+                    for prefix in prefixes
+                ),
+            )
+            found.update(
+                queryset.filter(condition).values_list(field, flat=True)
+            )
+    return {image_root(name) for name in found} & set(roots)
+
+
+def _variant_root(name):
+    """Основа имени оригинала для файла варианта, иначе None"""
+    if not name.startswith(f"{VARIANT_DIR}/"):
+        return None
+    return posixpath.basename(name).rsplit("-", 1)[0]
+
+
+def find_orphans(names, references):
+    """
+    Файлы из отсортированного списка names, на которые нет ссылок;
+    references — SortedCursor по ссылкам из базы, общий для всего прохода
+    """
+    orphans = []
+    variants = {}
+    for name in names:
+        root = _variant_root(name)
+        if root is not None:
+            variants[name] = root
+        elif not references.contains(name):
+            orphans.append(name)
+    roots = live_roots(set(variants.values()))
+    orphans.extend(
+        name for name, root in variants.items() if root not in roots
+    )
+    return orphans
+
+
+def _still_orphans(candidates):
+    """
+    Повторная проверка перед удалением: пока шёл обход, на файл
+    могла появиться ссылка
+    """
+    names = [name for name, _ in candidates]
+    kept = referenced(names)
+    roots = live_roots({_variant_root(name) for name in names} - {None})
+    return [
+        (name, size)
+        for name, size in candidates
+        if name not in kept and _variant_root(name) not in roots
+    ]
+
+
+def collect(
+    storage,
+    progress,
+    dry_run=False,
+    min_age=MIN_AGE,
+    rate=None,
+    batch_size=BATCH_SIZE,
+    on_orphan=None,
+    on_batch=None,
+):
+    """
+    Удаляет файлы под MEDIA_DIR, на которые нет ссылок в базе, продолжая
+    с progress.last; список файлов и ссылки идут навстречу друг другу
+    по возрастанию, поэтому в памяти держится одна порция
+    """
+    throttle = Throttle(rate)
+    references = SortedCursor(iter_references(progress.last, batch_size))
+    files = iter_files(storage, MEDIA_DIR, progress.last)
+    while True:
+        names = list(itertools.islice(files, batch_size))
+        if not names:
+            return progress
+        stale = time.time() - min_age
+        candidates = []
+        for name in find_orphans(names, references):
+            throttle.wait()
+            try:
+                stat = os.stat(storage.path(name))
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime <= stale:
+                candidates.append((name, stat.st_size))
+        if candidates and not dry_run:
+            candidates = _still_orphans(candidates)
+        for name, size in candidates:
+            if not dry_run:
+                throttle.wait()
+                storage.delete(name)
+            progress.orphans += 1
+            progress.freed += size
+            if on_orphan is not None:
+                on_orphan(name, size)
+        progress.scanned += len(names)
+        progress.last = names[-1]
+        if on_batch is not None:
+            on_batch(progress)
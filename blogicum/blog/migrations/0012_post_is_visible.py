@@ -0,0 +1,95 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_visibility(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    Category = apps.get_model("blog", "Category")
+    Location = apps.get_model("blog", "Location")
+    Post.objects.update(
+        is_visible=models.Case(
+            models.When(
+                models.Q(is_published=True)
+                & models.Exists(
+                    Category.objects.filter(
+                        pk=models.OuterRef("category_id"), is_published=True
+                    )
+                ),
+                then=models.Value(True),
+            ),
+            default=models.Value(False),
+        ),
+        visible_location=models.Case(
+            models.When(
+                models.Exists(
+                    Location.objects.filter(
+                        pk=models.OuterRef("location_id"), is_published=True
+                    )
+                ),
+                then=models.F("location_id"),
+            ),
+            default=None,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0011_feed_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_published_feed_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_category_feed_idx",
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="is_visible",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Опубликована сама публикация и её категория",
+                verbose_name="Видна в лентах",
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="visible_location",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="Местоположение, если оно опубликовано",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="blog.location",
+                verbose_name="Показываемое местоположение",
+            ),
+        ),
+        migrations.RunPython(fill_visibility, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_visible", True)),
+                fields=["-pub_date", "-id"],
+                name="post_published_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_visible", True)),
+                fields=["category", "-pub_date", "-id"],
+                name="post_category_feed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:07
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 10
+EXCERPT_MAX_LENGTH = 512
+BATCH_SIZE = 500
+
+
+def render_texts(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .only("pk", "text")
+            .order_by("pk")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        for post in batch:
+            post.excerpt = Truncator(
+                Truncator(post.text).words(EXCERPT_WORDS, truncate=" …")
+            ).chars(EXCERPT_MAX_LENGTH)
+            post.text_html = linebreaksbr(post.text, autoescape=True)
+        Post.objects.bulk_update(batch, ("excerpt", "text_html"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0012_post_is_visible"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=512,
+                verbose_name="Анонс",
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="text_html",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Текст в HTML"
+            ),
+        ),
+        migrations.RunPython(render_texts, migrations.RunPython.noop),
+    ]
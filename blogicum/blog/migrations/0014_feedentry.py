@@ -0,0 +1,105 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FEED_FIELDS = (
+    "pub_date",
+    "category_id",
+    "author_id",
+    "comment_count",
+    "excerpt",
+)
+
+
+def fill_feed(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    FeedEntry = apps.get_model("blog", "FeedEntry")
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(post_id=row["pk"], **{f: row[f] for f in FEED_FIELDS})
+            for row in Post.objects.filter(is_visible=True)
+            .values("pk", *FEED_FIELDS)
+            .iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0013_post_excerpt_text_html"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="feed_entry",
+                        serialize=False,
+                        to="blog.post",
+                        verbose_name="Публикация",
+                    ),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(
+                        verbose_name="Дата и время публикации"
+                    ),
+                ),
+                (
+                    "comment_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество комментариев"
+                    ),
+                ),
+                (
+                    "excerpt",
+                    models.CharField(
+                        blank=True, max_length=512, verbose_name="Анонс"
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор публикации",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="blog.category",
+                        verbose_name="Категория",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "запись ленты",
+                "verbose_name_plural": "Лента",
+                "ordering": ("-pub_date", "-post"),
+                "indexes": [
+                    models.Index(
+                        fields=["-pub_date", "-post"], name="feed_pub_date_idx"
+                    ),
+                    models.Index(
+                        fields=["category", "-pub_date", "-post"],
+                        name="feed_category_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
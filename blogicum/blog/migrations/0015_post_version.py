@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0014_feedentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="version",
+            field=models.PositiveBigIntegerField(
+                default=0,
+                editable=False,
+                help_text="Меняется при любом изменении, видимом в карточке",
+                verbose_name="Версия",
+            ),
+        ),
+    ]
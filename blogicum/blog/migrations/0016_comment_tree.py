@@ -0,0 +1,86 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+PATH_STEP = 7
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def fill_paths(apps, schema_editor):
+    """Существующие комментарии становятся корнями веток"""
+    Comment = apps.get_model("blog", "Comment")
+    batch = []
+    for comment in Comment.objects.only("pk").iterator(chunk_size=500):
+        pk, digits = comment.pk, ""
+        while pk:
+            pk, digit = divmod(pk, 36)
+            digits = DIGITS[digit] + digits
+        comment.path = digits.rjust(PATH_STEP, "0")
+        batch.append(comment)
+        if len(batch) >= 500:
+            Comment.objects.bulk_update(batch, ["path"])
+            batch = []
+    Comment.objects.bulk_update(batch, ["path"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0015_post_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="comment_post_created_idx",
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False, verbose_name="Уровень вложенности"
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="replies",
+                to="blog.comment",
+                verbose_name="Ответ на",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(
+                default="",
+                editable=False,
+                help_text="Пути предков и id комментария в base36",
+                max_length=252,
+                verbose_name="Путь в дереве",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="reply_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество ответов"
+            ),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "path"], name="comment_post_path_idx"
+            ),
+        ),
+    ]
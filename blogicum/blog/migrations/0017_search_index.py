@@ -0,0 +1,98 @@
+from django.db import migrations
+
+TOKENIZE = "unicode61 remove_diacritics 2"
+
+# Внешнее содержимое: индекс хранит только словарь, тексты берутся
+# из самих таблиц; триггеры ловят и массовые UPDATE в обход save()
+CREATE_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE blog_post_fts USING fts5(
+        title, text, content='blog_post', content_rowid='id',
+        tokenize='{TOKENIZE}'
+    )
+    """,
+    """
+    CREATE TRIGGER blog_post_fts_insert AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_post_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_post_fts_delete AFTER DELETE ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_post_fts_update AFTER UPDATE OF title, text
+    ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO blog_post_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE VIRTUAL TABLE blog_comment_fts USING fts5(
+        text, content='blog_comment', content_rowid='id',
+        tokenize='{TOKENIZE}'
+    )
+    """,
+    """
+    CREATE TRIGGER blog_comment_fts_insert AFTER INSERT ON blog_comment
+    BEGIN
+        INSERT INTO blog_comment_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_comment_fts_delete AFTER DELETE ON blog_comment
+    BEGIN
+        INSERT INTO blog_comment_fts(blog_comment_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER blog_comment_fts_update AFTER UPDATE OF text
+    ON blog_comment BEGIN
+        INSERT INTO blog_comment_fts(blog_comment_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO blog_comment_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO blog_post_fts(blog_post_fts) VALUES ('rebuild')",
+    "INSERT INTO blog_comment_fts(blog_comment_fts) VALUES ('rebuild')",
+)
+
+DROP_SQL = (
+    "DROP TRIGGER IF EXISTS blog_post_fts_insert",
+    "DROP TRIGGER IF EXISTS blog_post_fts_delete",
+    "DROP TRIGGER IF EXISTS blog_post_fts_update",
+    "DROP TABLE IF EXISTS blog_post_fts",
+    "DROP TRIGGER IF EXISTS blog_comment_fts_insert",
+    "DROP TRIGGER IF EXISTS blog_comment_fts_delete",
+    "DROP TRIGGER IF EXISTS blog_comment_fts_update",
+    "DROP TABLE IF EXISTS blog_comment_fts",
+)
+
+
+def run_sqlite(statements):
+    """На других СУБД поиск работает без полнотекстового индекса"""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0016_comment_tree"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0017_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AutocompleteTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("post", "Публикация"),
+                            ("user", "Пользователь"),
+                            ("category", "Категория"),
+                        ],
+                        max_length=16,
+                        verbose_name="Тип",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(verbose_name="Id объекта"),
+                ),
+                (
+                    "label",
+                    models.CharField(max_length=256, verbose_name="Подпись"),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=256, verbose_name="Нормализованная подпись"
+                    ),
+                ),
+                (
+                    "url",
+                    models.CharField(max_length=256, verbose_name="Адрес"),
+                ),
+                (
+                    "available_from",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Для отложенных публикаций — дата публикации",
+                        null=True,
+                        verbose_name="Показывать с",
+                    ),
+                ),
+                (
+                    "gram_count",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Количество триграмм"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "подсказка",
+                "verbose_name_plural": "Подсказки",
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "key"],
+                        name="autocomplete_term_key_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"),
+                        name="autocomplete_term_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="AutocompleteTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("post", "Публикация"),
+                            ("user", "Пользователь"),
+                            ("category", "Категория"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("gram", models.CharField(max_length=3)),
+                (
+                    "term",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trigrams",
+                        to="blog.autocompleteterm",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "триграмма",
+                "verbose_name_plural": "Триграммы",
+                "indexes": [
+                    models.Index(
+                        fields=["gram", "kind", "term"],
+                        name="autocomplete_gram_idx",
+                    )
+                ],
+            },
+        ),
+    ]
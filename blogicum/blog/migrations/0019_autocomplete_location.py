@@ -0,0 +1,129 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:22
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+from django.urls import reverse
+
+BATCH_SIZE = 500
+
+
+def normalize(text):
+    return " ".join(re.findall(r"\w+", text.lower().replace("ё", "е")))
+
+
+def trigrams(key):
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def fill_terms(apps, schema_editor):
+    AutocompleteTerm = apps.get_model("blog", "AutocompleteTerm")
+    AutocompleteTrigram = apps.get_model("blog", "AutocompleteTrigram")
+    Post = apps.get_model("blog", "Post")
+    Category = apps.get_model("blog", "Category")
+    Location = apps.get_model("blog", "Location")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    def rows():
+        for pk, title, pub_date in Post.objects.filter(
+            is_visible=True
+        ).values_list("pk", "title", "pub_date"):
+            url = reverse("blog:post_detail", args=(pk,))
+            yield "post", pk, title, url, pub_date
+        for pk, username in User.objects.filter(is_active=True).values_list(
+            "pk", "username"
+        ):
+            url = reverse("blog:profile", args=(username,))
+            yield "user", pk, username, url, None
+        for pk, title, slug in Category.objects.filter(
+            is_published=True
+        ).values_list("pk", "title", "slug"):
+            url = reverse("blog:category_posts", args=(slug,))
+            yield "category", pk, title, url, None
+        for pk, name in Location.objects.filter(is_published=True).values_list(
+            "pk", "name"
+        ):
+            yield "location", pk, name, "", None
+
+    def save(batch):
+        terms = AutocompleteTerm.objects.bulk_create(term for term, _ in batch)
+        AutocompleteTrigram.objects.bulk_create(
+            (
+                AutocompleteTrigram(term=term, kind=term.kind, gram=gram)
+                for term, (_, grams) in zip(terms, batch)
+                for gram in grams
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    AutocompleteTerm.objects.all().delete()
+    batch = []
+    for kind, pk, label, url, available_from in rows():
+        key = normalize(label)[:256]
+        grams = trigrams(key)
+        term = AutocompleteTerm(
+            kind=kind,
+            object_id=pk,
+            label=label,
+            key=key,
+            url=url,
+            available_from=available_from,
+            gram_count=len(grams),
+        )
+        batch.append((term, grams))
+        if len(batch) >= BATCH_SIZE:
+            save(batch)
+            batch = []
+    if batch:
+        save(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0018_autocomplete"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="autocompleteterm",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("post", "Публикация"),
+                    ("user", "Пользователь"),
+                    ("category", "Категория"),
+                    ("location", "Местоположение"),
+                ],
+                max_length=16,
+                verbose_name="Тип",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="autocompleteterm",
+            name="url",
+            field=models.CharField(
+                blank=True, max_length=256, verbose_name="Адрес"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="autocompletetrigram",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("post", "Публикация"),
+                    ("user", "Пользователь"),
+                    ("category", "Категория"),
+                    ("location", "Местоположение"),
+                ],
+                max_length=16,
+            ),
+        ),
+        migrations.RunPython(fill_terms, migrations.RunPython.noop),
+    ]
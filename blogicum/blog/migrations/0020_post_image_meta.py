@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0019_autocomplete_location"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_meta",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Размеры, заглушка и уменьшенные копии изображения",
+                verbose_name="Варианты изображения",
+            ),
+        ),
+    ]
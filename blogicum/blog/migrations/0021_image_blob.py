@@ -0,0 +1,93 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:27
+
+import blog.storage
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    """Учитывает изображения, загруженные до появления счётчиков"""
+    Post = apps.get_model("blog", "Post")
+    ImageBlob = apps.get_model("blog", "ImageBlob")
+    rows = (
+        Post.objects.exclude(image__isnull=True)
+        .exclude(image="")
+        .values("image")
+        .annotate(ref_count=Count("pk"))
+        .order_by()
+    )
+    blobs = []
+    for row in rows.iterator():
+        try:
+            size = default_storage.size(row["image"])
+        except OSError:
+            size = 0
+        blobs.append(
+            ImageBlob(name=row["image"], size=size, ref_count=row["ref_count"])
+        )
+    ImageBlob.objects.bulk_create(blobs, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0020_post_image_meta"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=256, unique=True, verbose_name="Имя файла"
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Размер, байт"
+                    ),
+                ),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество ссылок"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Добавлено"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "файл изображения",
+                "verbose_name_plural": "Файлы изображений",
+            },
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=blog.storage.get_image_storage,
+                upload_to="post_images/",
+                verbose_name="Изображение поста",
+            ),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0021_image_blob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["image"], name="post_image_idx"),
+        ),
+    ]
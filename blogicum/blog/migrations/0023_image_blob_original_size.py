@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0022_post_image_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imageblob",
+            name="original_size",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                help_text="Пусто, если файл ещё не пережимался",
+                null=True,
+                verbose_name="Размер до обработки, байт",
+            ),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0023_image_blob_original_size"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "token",
+                    models.CharField(
+                        editable=False, max_length=64, unique=True
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(max_length=256, verbose_name="Имя"),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        verbose_name="Размер, байт"
+                    ),
+                ),
+                (
+                    "received",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Получено, байт"
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        blank=True,
+                        help_text="Ожидаемый, если его передал клиент, затем вычисленный",
+                        max_length=64,
+                        verbose_name="SHA-256",
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Завершено"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Изменено"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_sessions",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "загрузка",
+                "verbose_name_plural": "Загрузки",
+                "indexes": [
+                    models.Index(
+                        fields=["updated_at"], name="upload_updated_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0024_upload_session"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReplicaStamp",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "stamped_at",
+                    models.DateTimeField(verbose_name="Время отметки"),
+                ),
+            ],
+            options={
+                "verbose_name": "отметка репликации",
+                "verbose_name_plural": "Отметки репликации",
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0025_replica_stamp"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="feedentry",
+            name="comment_count",
+        ),
+        migrations.RemoveField(
+            model_name="feedentry",
+            name="excerpt",
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0026_feedentry_drop_copies"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SchedulerRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "published_until",
+                    models.DateTimeField(
+                        verbose_name="Публикации выпущены до"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "запуск планировщика",
+                "verbose_name_plural": "Запуски планировщика",
+            },
+        ),
+    ]
@@ -1,9 +1,34 @@
+import time
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+from .storage import get_image_storage
 
 User = get_user_model()
 
 MAX_LENGTH = 256
+EXCERPT_WORDS = 10
+EXCERPT_MAX_LENGTH = 512
+# Сегмент пути комментария — его id в base36 фиксированной ширины,
+# поэтому сортировка по пути даёт порядок обхода дерева в глубину
+PATH_STEP = 7
+PATH_MAX_LENGTH = 252
+MAX_COMMENT_DEPTH = PATH_MAX_LENGTH // PATH_STEP
+# Вариант изображения для браузеров без поддержки srcset
+FALLBACK_IMAGE_WIDTH = 640
+
+
+def next_version():
+    """
+    Новая версия публикации: метка времени в наносекундах не повторяется
+    даже при сохранении устаревшего экземпляра
+    """
+    return time.time_ns()
 
 
 class BaseModel(models.Model):
@@ -52,6 +77,9 @@ class Category(BaseModel):
         ),
     )
 
+    # Поля, которые видны в лентах и карточках публикаций категории
+    LISTED_FIELDS = ("is_published", "title", "slug")
+
     class Meta:
         verbose_name = "категория"
         verbose_name_plural = "Категории"
@@ -59,6 +87,68 @@ class Category(BaseModel):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: instance.__dict__[name]
+            for name in cls.LISTED_FIELDS
+            if name in instance.__dict__
+        }
+        return instance
+
+
+class PostQuerySet(models.QuerySet):
+    def recount_comments(self):
+        """Пересчитывает счётчики комментариев публикаций одним запросом"""
+        return self.update(
+            version=next_version(),
+            comment_count=Coalesce(
+                models.Subquery(
+                    Comment.objects.filter(post=models.OuterRef("pk"))
+                    .order_by()
+                    .values("post")
+                    .annotate(total=models.Count("pk"))
+                    .values("total")
+                ),
+                0,
+            ),
+        )
+
+    def refresh_visibility(self):
+        """
+        Пересчитывает флаги видимости публикаций одним запросом UPDATE,
+        например после снятия с публикации категории или местоположения
+        """
+        return self.update(
+            version=next_version(),
+            is_visible=models.Case(
+                models.When(
+                    models.Q(is_published=True)
+                    & models.Exists(
+                        Category.objects.filter(
+                            pk=models.OuterRef("category_id"),
+                            is_published=True,
+                        )
+                    ),
+                    then=models.Value(True),
+                ),
+                default=models.Value(False),
+            ),
+            visible_location=models.Case(
+                models.When(
+                    models.Exists(
+                        Location.objects.filter(
+                            pk=models.OuterRef("location_id"),
+                            is_published=True,
+                        )
+                    ),
+                    then=models.F("location_id"),
+                ),
+                default=None,
+            ),
+        )
+
 
 class Post(BaseModel):
     """Публикация"""
@@ -97,19 +187,166 @@ class Post(BaseModel):
 
     image = models.ImageField(
         upload_to="post_images/",
+        storage=get_image_storage,
         null=True,
         blank=True,
         verbose_name="Изображение поста",
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество комментариев",
+    )
+    is_visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Видна в лентах",
+        help_text="Опубликована сама публикация и её категория",
+    )
+    visible_location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        editable=False,
+        related_name="+",
+        verbose_name="Показываемое местоположение",
+        help_text="Местоположение, если оно опубликовано",
+    )
+
+    excerpt = models.CharField(
+        max_length=EXCERPT_MAX_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name="Анонс",
+    )
+    text_html = models.TextField(
+        blank=True, editable=False, verbose_name="Текст в HTML"
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Версия",
+        help_text="Меняется при любом изменении, видимом в карточке",
+    )
+    image_meta = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Варианты изображения",
+        help_text="Размеры, заглушка и уменьшенные копии изображения",
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = "публикация"
         verbose_name_plural = "Публикации"
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "-id"),
+                condition=models.Q(is_visible=True),
+                name="post_published_feed_idx",
+            ),
+            models.Index(
+                fields=("category", "-pub_date", "-id"),
+                condition=models.Q(is_visible=True),
+                name="post_category_feed_idx",
+            ),
+            models.Index(
+                fields=("author", "-pub_date", "-id"),
+                name="post_author_feed_idx",
+            ),
+            models.Index(fields=("image",), name="post_image_idx"),
+        )
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        if "image" in instance.__dict__:
+            instance._loaded_image = instance.__dict__["image"] or None
+        return instance
+
+    def render_text(self):
+        """Готовит анонс для ленты и HTML полного текста"""
+        self.excerpt = Truncator(
+            Truncator(self.text).words(EXCERPT_WORDS, truncate=" …")
+        ).chars(EXCERPT_MAX_LENGTH)
+        self.text_html = linebreaksbr(self.text, autoescape=True)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if "text" not in self.get_deferred_fields() and (
+            update_fields is None or "text" in update_fields
+        ):
+            self.render_text()
+            if update_fields is not None:
+                update_fields = {*update_fields, "excerpt", "text_html"}
+        self.is_visible = bool(
+            self.is_published
+            and self.category_id
+            and self.category.is_published
+        )
+        self.visible_location = (
+            self.location
+            if self.location_id and self.location.is_published
+            else None
+        )
+        self._image_changed = False
+        if (
+            update_fields is None or "image" in update_fields
+        ) and self.image_meta.get("source") != (self.image.name or None):
+            # Варианты старого изображения больше не подходят; новые
+            # готовятся в фоне после сохранения
+            self.image_meta = {}
+            self._image_changed = bool(self.image)
+            if update_fields is not None:
+                update_fields = {*update_fields, "image_meta"}
+        self.version = next_version()
+        if update_fields is not None:
+            kwargs["update_fields"] = {
+                *update_fields,
+                "is_visible",
+                "visible_location",
+                "version",
+            }
+        super().save(*args, **kwargs)
+
+    @property
+    def responsive_image(self):
+        """
+        Данные для адаптивного изображения в шаблоне: ссылки srcset
+        по форматам, запасная ссылка, размеры и заглушка
+        None, пока варианты не готовы
+        """
+        meta = self.image_meta
+        if not self.image or meta.get("source") != self.image.name:
+            return None
+        # Варианты лежат вне хранилища оригиналов, под своими именами
+        storage = default_storage
+        srcset = {
+            fmt: ", ".join(
+                f"{storage.url(name)} {width}w" for width, name in variants
+            )
+            for fmt, variants in meta["variants"].items()
+        }
+        jpeg = meta["variants"]["jpeg"]
+        fallback = next(
+            (name for width, name in jpeg if width >= FALLBACK_IMAGE_WIDTH),
+            jpeg[-1][1],
+        )
+        return {
+            "srcset": srcset,
+            "src": storage.url(fallback),
+            "width": meta["width"],
+            "height": meta["height"],
+            "lqip": meta["lqip"],
+        }
+
 
 class Comment(models.Model):
     """Комментарий"""
@@ -122,15 +359,82 @@ class Comment(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True, verbose_name="Добавлено"
     )
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="replies",
+        verbose_name="Ответ на",
+    )
+    path = models.CharField(
+        max_length=PATH_MAX_LENGTH,
+        editable=False,
+        verbose_name="Путь в дереве",
+        help_text="Пути предков и id комментария в base36",
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0, editable=False, verbose_name="Уровень вложенности"
+    )
+    reply_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество ответов"
+    )
 
     class Meta:
         verbose_name = "комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ("created_at",)
+        indexes = (
+            models.Index(
+                fields=("post", "path"),
+                name="comment_post_path_idx",
+            ),
+        )
 
     def __str__(self):
         return self.text
 
+    @staticmethod
+    def path_segment(pk):
+        """Сегмент пути для комментария с данным id"""
+        digits = ""
+        while pk:
+            pk, digit = divmod(pk, 36)
+            digits = "0123456789abcdefghijklmnopqrstuvwxyz"[digit] + digits
+        return digits.rjust(PATH_STEP, "0")
+
+    def ancestor_paths(self):
+        """Пути всех предков комментария"""
+        return [
+            self.path[:end]
+            for end in range(PATH_STEP, len(self.path), PATH_STEP)
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            return super().save(*args, **kwargs)
+        # Слишком глубокие ответы становятся ответами на родителя
+        while self.parent and self.parent.depth >= MAX_COMMENT_DEPTH - 1:
+            self.parent = self.parent.parent
+        if self.parent:
+            self.post_id = self.parent.post_id
+            self.depth = self.parent.depth + 1
+        # Путь зависит от id, который известен только после вставки;
+        # вставка и запись пути не должны разделяться
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            self.path = (
+                self.parent.path if self.parent else ""
+            ) + self.path_segment(self.pk)
+            type(self).objects.filter(pk=self.pk).update(path=self.path)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_post_id = instance.__dict__.get("post_id")
+        return instance
+
 
 class Page(BaseModel):
     title = models.CharField(max_length=MAX_LENGTH, verbose_name="Заголовок")
@@ -143,3 +447,247 @@ class Page(BaseModel):
 
     def __str__(self):
         return self.title
+
+
+class FeedEntry(models.Model):
+    """
+    Строка материализованной ленты: узкая копия видимой публикации,
+    по которой главная страница и страницы категорий выбирают и считают
+    записи страницы без обращения к таблице публикаций; сами карточки
+    строятся по публикациям, поэтому счётчики и анонсы здесь не дублируются
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="feed_entry",
+        verbose_name="Публикация",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата и время публикации")
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Категория",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор публикации",
+    )
+
+    class Meta:
+        verbose_name = "запись ленты"
+        verbose_name_plural = "Лента"
+        ordering = ("-pub_date", "-post")
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "-post"), name="feed_pub_date_idx"
+            ),
+            models.Index(
+                fields=("category", "-pub_date", "-post"),
+                name="feed_category_idx",
+            ),
+        )
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class AutocompleteTerm(models.Model):
+    """
+    Строка для подсказок в поиске: заголовок публикации, имя
+    пользователя или категория вместе с нормализованным ключом
+    """
+
+    POST = "post"
+    USER = "user"
+    CATEGORY = "category"
+    LOCATION = "location"
+    KINDS = (
+        (POST, "Публикация"),
+        (USER, "Пользователь"),
+        (CATEGORY, "Категория"),
+        (LOCATION, "Местоположение"),
+    )
+
+    kind = models.CharField(max_length=16, choices=KINDS, verbose_name="Тип")
+    object_id = models.PositiveBigIntegerField(verbose_name="Id объекта")
+    label = models.CharField(max_length=MAX_LENGTH, verbose_name="Подпись")
+    key = models.CharField(
+        max_length=MAX_LENGTH, verbose_name="Нормализованная подпись"
+    )
+    url = models.CharField(
+        max_length=MAX_LENGTH, blank=True, verbose_name="Адрес"
+    )
+    available_from = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Показывать с",
+        help_text="Для отложенных публикаций — дата публикации",
+    )
+    gram_count = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Количество триграмм"
+    )
+
+    class Meta:
+        verbose_name = "подсказка"
+        verbose_name_plural = "Подсказки"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("kind", "object_id"), name="autocomplete_term_uniq"
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("kind", "key"), name="autocomplete_term_key_idx"
+            ),
+        )
+
+    def __str__(self):
+        return self.label
+
+
+class AutocompleteTrigram(models.Model):
+    """Триграмма подписи; по индексу (gram, kind) ищутся кандидаты"""
+
+    term = models.ForeignKey(
+        AutocompleteTerm, on_delete=models.CASCADE, related_name="trigrams"
+    )
+    kind = models.CharField(max_length=16, choices=AutocompleteTerm.KINDS)
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        verbose_name = "триграмма"
+        verbose_name_plural = "Триграммы"
+        indexes = (
+            models.Index(
+                fields=("gram", "kind", "term"),
+                name="autocomplete_gram_idx",
+            ),
+        )
+
+    def __str__(self):
+        return self.gram
+
+
+class ImageBlob(models.Model):
+    """
+    Файл изображения в хранилище и количество публикаций, которые
+    на него ссылаются; запись удаляется, когда ссылок не остаётся,
+    а сам файл затем убирает collect_media_garbage
+    """
+
+    name = models.CharField(
+        max_length=MAX_LENGTH, unique=True, verbose_name="Имя файла"
+    )
+    size = models.PositiveBigIntegerField(
+        default=0, verbose_name="Размер, байт"
+    )
+    original_size = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Размер до обработки, байт",
+        help_text="Пусто, если файл ещё не пережимался",
+    )
+    ref_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество ссылок"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Добавлено"
+    )
+
+    class Meta:
+        verbose_name = "файл изображения"
+        verbose_name_plural = "Файлы изображений"
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def savings(self):
+        """Сколько байт сэкономила обработка при загрузке"""
+        if self.original_size is None:
+            return None
+        return self.original_size - self.size
+
+
+class UploadSession(models.Model):
+    """
+    Незавершённая или ещё не привязанная к публикации загрузка
+    изображения по частям; данные копятся во временном файле
+    """
+
+    token = models.CharField(max_length=64, unique=True, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+        verbose_name="Пользователь",
+    )
+    filename = models.CharField(max_length=MAX_LENGTH, verbose_name="Имя")
+    size = models.PositiveBigIntegerField(verbose_name="Размер, байт")
+    received = models.PositiveBigIntegerField(
+        default=0, verbose_name="Получено, байт"
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="SHA-256",
+        help_text="Ожидаемый, если его передал клиент, затем вычисленный",
+    )
+    completed_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Завершено"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменено")
+
+    class Meta:
+        verbose_name = "загрузка"
+        verbose_name_plural = "Загрузки"
+        indexes = (
+            models.Index(fields=("updated_at",), name="upload_updated_idx"),
+        )
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+
+class ReplicaStamp(models.Model):
+    """
+    Отметка времени, которую sync_replica ставит в основной базе перед
+    копированием; по ней в реплике видно, насколько та отстаёт
+    """
+
+    stamped_at = models.DateTimeField(verbose_name="Время отметки")
+
+    class Meta:
+        verbose_name = "отметка репликации"
+        verbose_name_plural = "Отметки репликации"
+
+    def __str__(self):
+        return f"{self.stamped_at:%Y-%m-%d %H:%M:%S}"
+
+
+class SchedulerRun(models.Model):
+    """
+    Момент, до которого планировщик уже выпустил отложенные публикации;
+    хранится в базе, чтобы запуск из cron или после простоя продолжал
+    с того места, где остановился предыдущий
+    """
+
+    published_until = models.DateTimeField(
+        verbose_name="Публикации выпущены до"
+    )
+
+    class Meta:
+        verbose_name = "запуск планировщика"
+        verbose_name_plural = "Запуски планировщика"
+
+    def __str__(self):
+        return f"{self.published_until:%Y-%m-%d %H:%M:%S}"
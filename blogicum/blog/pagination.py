@@ -0,0 +1,234 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import cached_count
+
+FEED_ORDERING = ("-pub_date", "-pk")
+COMMENT_ORDERING = ("path",)
+FEED_CACHE_SCOPES = ("posts",)
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа сортировки в непрозрачный токен"""
+    payload = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Распаковывает токен; при повреждённом токене — ValueError"""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Некорректный курсор")
+    if not isinstance(values, list):
+        raise ValueError("Некорректный курсор")
+    return values
+
+
+class WindowedPage(Page):
+    """Страница, знающая окно соседних номеров для ссылок"""
+
+    @cached_property
+    def last_linked_page(self):
+        """Последний номер страницы, на который можно поставить ссылку"""
+        if self.paginator.max_linked_page is None:
+            return self.paginator.num_pages
+        return min(self.paginator.num_pages, self.paginator.max_linked_page)
+
+    @cached_property
+    def page_window(self):
+        half = self.paginator.num_links // 2
+        first = max(1, self.number - half)
+        last = min(self.last_linked_page, first + self.paginator.num_links - 1)
+        first = max(1, last - self.paginator.num_links + 1)
+        return range(first, last + 1)
+
+
+class WindowedPaginator(Paginator):
+    """
+    Пагинатор, который выводит лишь окно из num_links ссылок и берёт
+    общее количество объектов из кэша по ключу count_key
+    Кэш сбрасывается при изменении публикаций и категорий
+    max_linked_page: страницы глубже не получают ссылок по номеру
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        num_links=10,
+        count_key=None,
+        scopes=FEED_CACHE_SCOPES,
+        max_linked_page=None,
+        **kwargs,
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.num_links = num_links
+        self.max_linked_page = max_linked_page
+        self.count_key = count_key
+        self.scopes = scopes
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return cached_count(
+            self.count_key, self.scopes, lambda: Paginator.count.func(self)
+        )
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации, совместимая по интерфейсу с Page"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинация по ключу сортировки (keyset): вместо OFFSET выбирает
+    записи строго после или до курсора, поэтому стоимость запроса
+    не зависит от глубины страницы
+    ordering: поля сортировки, последнее из них должно быть уникальным
+    """
+
+    def __init__(self, queryset, per_page, ordering=FEED_ORDERING):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [name.lstrip("-") for name in ordering]
+
+    def cursor_for(self, obj):
+        """Курсор, указывающий на переданный объект"""
+        return encode_cursor(
+            [
+                obj.pk if name == "pk" else getattr(obj, name)
+                for name in self.fields
+            ]
+        )
+
+    def _parse(self, token):
+        values = decode_cursor(token)
+        if len(values) != len(self.fields):
+            raise ValueError("Некорректный курсор")
+        opts = self.queryset.model._meta
+        try:
+            return [
+                (opts.pk if name == "pk" else opts.get_field(name)).to_python(
+                    value
+                )
+                for name, value in zip(self.fields, values)
+            ]
+        except ValidationError:
+            raise ValueError("Некорректный курсор")
+
+    def _seek(self, values, forward):
+        """Условие «строго после курсора» в порядке сортировки"""
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            step = Q(**{f"{self.fields[index]}__{lookup}": values[index]})
+            for field, value in zip(self.fields[:index], values):
+                step &= Q(**{field: value})
+            condition |= step
+        return condition
+
+    def _reverse_ordering(self):
+        return [
+            name[1:] if name.startswith("-") else f"-{name}"
+            for name in self.ordering
+        ]
+
+    def first_page(self):
+        rows = list(
+            self.queryset.order_by(*self.ordering)[: self.per_page + 1]
+        )
+        return self._forward_page(rows, has_previous=False)
+
+    def _forward_page(self, rows, has_previous):
+        object_list = rows[: self.per_page]
+        return CursorPage(
+            object_list,
+            next_cursor=(
+                self.cursor_for(object_list[-1])
+                if len(rows) > self.per_page
+                else None
+            ),
+            previous_cursor=(
+                self.cursor_for(object_list[0])
+                if has_previous and object_list
+                else None
+            ),
+        )
+
+    def get_page(self, after=None, before=None):
+        """
+        Возвращает страницу после курсора after или перед курсором before;
+        некорректный курсор приводит к первой странице
+        """
+        try:
+            if after:
+                values = self._parse(after)
+                rows = list(
+                    self.queryset.filter(
+                        self._seek(values, forward=True)
+                    ).order_by(*self.ordering)[: self.per_page + 1]
+                )
+                return self._forward_page(rows, has_previous=True)
+            if before:
+                values = self._parse(before)
+                rows = list(
+                    self.queryset.filter(
+                        self._seek(values, forward=False)
+                    ).order_by(*self._reverse_ordering())[: self.per_page + 1]
+                )
+                if len(rows) <= self.per_page:
+                    return self.first_page()
+                object_list = rows[: self.per_page][::-1]
+                return CursorPage(
+                    object_list,
+                    next_cursor=self.cursor_for(object_list[-1]),
+                    previous_cursor=self.cursor_for(object_list[0]),
+                )
+        except ValueError:
+            pass
+        return self.first_page()
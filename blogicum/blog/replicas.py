@@ -0,0 +1,187 @@
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .cache import skip_page_cache, stored_versions
+from .models import ReplicaStamp
+
+PRIMARY = "default"
+STICKY_COOKIE = "blog_last_write"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Как долго процесс доверяет прочитанной из реплики отметке, секунды
+STAMP_TTL = 1.0
+
+# Запрос представления, которому разрешено читать из реплик
+_replica_request = ContextVar("blog_replica_request", default=None)
+_stamps = {}
+_stamps_lock = threading.Lock()
+
+
+def last_write(request):
+    """Момент последней записи пользователя из cookie или 0"""
+    try:
+        written = float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return 0.0
+    if time.time() - written > settings.BLOG_PRIMARY_STICKY_SECONDS:
+        return 0.0
+    return written
+
+
+def read_from_replica(view):
+    """Разрешает безопасным запросам представления читать из реплик"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        token = _replica_request.set(request)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_request.reset(token)
+
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в основную базу"""
+    token = _replica_request.set(None)
+    try:
+        yield
+    finally:
+        _replica_request.reset(token)
+
+
+def required_stamp(request):
+    """Моменты, которые реплика должна застать для чтения и для кэша"""
+    scopes = getattr(request, "cache_scopes", ())
+    cached = getattr(request, "_replica_stamp", None)
+    if cached is None or cached[0] != scopes:
+        # Реплика, не догнавшая заведённую заново версию, годится
+        # только для ответа без кэша и валидаторов
+        versions = stored_versions(*scopes)
+        changed = max([last_write(request), *(v for v in versions if v > 0)])
+        cacheable = max([changed, *(-v for v in versions if v < 0)])
+        cached = scopes, (changed, cacheable)
+        request._replica_stamp = cached
+    return cached[1]
+
+
+def replica_stamp(alias):
+    """Момент, по состоянию на который реплика alias содержит данные, или 0"""
+    now = time.monotonic()
+    with _stamps_lock:
+        cached = _stamps.get(alias)
+    if cached is not None and now - cached[0] < STAMP_TTL:
+        return cached[1]
+    try:
+        stamp = (
+            ReplicaStamp.objects.using(alias)
+            .values_list("stamped_at", flat=True)
+            .first()
+        )
+    except DatabaseError:
+        # Недоступная реплика считается отставшей
+        stamp = None
+    value = stamp.timestamp() if stamp else 0.0
+    with _stamps_lock:
+        _stamps[alias] = (now, value)
+    return value
+
+
+def forget_stamps():
+    with _stamps_lock:
+        _stamps.clear()
+
+
+def fresh_replicas(written):
+    """Достаточно свежие реплики, уже содержащие запись из момента written"""
+    now = time.time()
+    return [
+        alias
+        for alias in settings.BLOG_READ_REPLICAS
+        if (stamp := replica_stamp(alias)) >= written
+        and now - stamp <= settings.BLOG_REPLICA_MAX_LAG
+    ]
+
+
+class ReplicaRouter:
+    """Направляет чтения помеченных представлений на свежие реплики"""
+
+    def db_for_read(self, model, **hints):
+        request = _replica_request.get()
+        if request is None or not settings.BLOG_READ_REPLICAS:
+            return None
+        changed, cacheable = required_stamp(request)
+        replicas = fresh_replicas(changed)
+        if not replicas:
+            return PRIMARY
+        alias = random.choice(replicas)
+        if replica_stamp(alias) < cacheable:
+            skip_page_cache(request)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.BLOG_READ_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.BLOG_READ_REPLICAS:
+            return False
+        return None
+
+
+class StickyPrimaryMiddleware:
+    """После записи запоминает её момент в cookie"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            response.set_cookie(
+                STICKY_COOKIE,
+                f"{time.time():.3f}",
+                max_age=settings.BLOG_PRIMARY_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def copy_database(path, pages=1024, sleep=0.005):
+    """Копирует основную базу в файл SQLite path порциями через backup API"""
+    ReplicaStamp.objects.using(PRIMARY).update_or_create(
+        pk=1, defaults={"stamped_at": timezone.now()}
+    )
+    source = connections[PRIMARY]
+    source.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        source.connection.backup(target, pages=pages, sleep=sleep)
+    finally:
+        target.close()
+
+
+def sync_replica(alias, **kwargs):
+    """Обновляет реплику alias, которая стоит на месте настоящей локально"""
+    copy_database(connections[alias].settings_dict["NAME"], **kwargs)
+    # Соединения процесса с репликой могли видеть старый файл
+    connections[alias].close()
+    forget_stamps()
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .feed import sync_feed
+from .models import Post, SchedulerRun
+from .signals import post_published
+
+
+def scheduled_posts():
+    """Видимые публикации, время которых задаётся pub_date"""
+    return Post.objects.filter(is_visible=True)
+
+
+def next_publication(after):
+    """Ближайшая отложенная дата публикации после указанного момента"""
+    return (
+        scheduled_posts()
+        .filter(pub_date__gt=after)
+        .order_by("pub_date")
+        .values_list("pub_date", flat=True)
+        .first()
+    )
+
+
+def publish_due_posts(since, until):
+    """
+    Выпускает публикации, время которых наступило в промежутке
+    (since, until]: обновляет их записи в ленте и оповещает
+    подписчиков сигнала post_published о необходимости сбросить кэши
+    Кэши сбрасываются в кэше Django, поэтому веб-процессы увидят это,
+    только если кэш общий для всех процессов
+    """
+    due = scheduled_posts().filter(pub_date__gt=since, pub_date__lte=until)
+    posts = list(due.select_related("author", "category"))
+    if posts:
+        sync_feed(due)
+        post_published.send(sender=Post, posts=posts)
+    SchedulerRun.objects.update_or_create(
+        pk=1, defaults={"published_until": until}
+    )
+    return posts
+
+
+def last_run():
+    """
+    Момент, до которого публикации уже выпущены; при первом запуске
+    планировщик оглядывается на BLOG_SCHEDULER_LOOKBACK секунд назад
+    """
+    published_until = SchedulerRun.objects.values_list(
+        "published_until", flat=True
+    ).first()
+    if published_until is not None:
+        return published_until
+    return timezone.now() - timedelta(seconds=settings.BLOG_SCHEDULER_LOOKBACK)
@@ -0,0 +1,214 @@
+import re
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .cache import make_key
+from .models import Post
+from .pagination import FEED_CACHE_SCOPES, FEED_ORDERING
+
+POST_INDEX = "blog_post_fts"
+COMMENT_INDEX = "blog_comment_fts"
+SEARCH_KEY_PREFIX = "blog:search:"
+SEARCH_CACHE_TIMEOUT = 30
+MAX_QUERY_TERMS = 10
+# Заголовок важнее текста при ранжировании BM25
+TITLE_WEIGHT = 5.0
+TEXT_WEIGHT = 1.0
+SNIPPET_TOKENS = 16
+# Управляющие символы не встречаются в тексте и не экранируются,
+# поэтому по ним подсветка безопасно превращается в <mark>
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+
+# Таблицы SQLite пересоздаются при части изменений схемы, и их триггеры
+# пропадают, поэтому после миграций триггеры ставятся заново
+TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {POST_INDEX}_insert AFTER INSERT ON blog_post
+    BEGIN
+        INSERT INTO {POST_INDEX}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {POST_INDEX}_delete AFTER DELETE ON blog_post
+    BEGIN
+        INSERT INTO {POST_INDEX}({POST_INDEX}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {POST_INDEX}_update
+    AFTER UPDATE OF title, text ON blog_post BEGIN
+        INSERT INTO {POST_INDEX}({POST_INDEX}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {POST_INDEX}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {COMMENT_INDEX}_insert
+    AFTER INSERT ON blog_comment BEGIN
+        INSERT INTO {COMMENT_INDEX}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {COMMENT_INDEX}_delete
+    AFTER DELETE ON blog_comment BEGIN
+        INSERT INTO {COMMENT_INDEX}({COMMENT_INDEX}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {COMMENT_INDEX}_update
+    AFTER UPDATE OF text ON blog_comment BEGIN
+        INSERT INTO {COMMENT_INDEX}({COMMENT_INDEX}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {COMMENT_INDEX}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+
+@dataclass
+class SearchResult:
+    """Найденная публикация с подсвеченными фрагментами"""
+
+    post_id: int
+    title: str
+    snippet: str
+    rank: float
+
+
+def is_supported():
+    """Полнотекстовый индекс FTS5 есть только в SQLite"""
+    return connection.vendor == "sqlite"
+
+
+def build_match(query):
+    """
+    Превращает ввод пользователя в выражение MATCH: все слова
+    обязательны, последнее ищется как префикс; синтаксис FTS5
+    из запроса не пропускается
+    """
+    terms = re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def highlight(text):
+    """Экранирует фрагмент и заменяет метки подсветки тегами <mark>"""
+    return mark_safe(
+        escape(text)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
+def match_filter(index, query):
+    """
+    Условие для queryset: первичный ключ среди найденных в индексе index
+    строк; None, если запрос пуст или индекса нет
+    """
+    match = build_match(query)
+    if match is None or not is_supported():
+        return None
+    return Q(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {index} WHERE {index} MATCH %s", (match,)
+        )
+    )
+
+
+def _search_index(match, limit, offset):
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = f"""
+        SELECT p.id,
+               snippet({POST_INDEX}, 0, %s, %s, '…', {SNIPPET_TOKENS}),
+               snippet({POST_INDEX}, 1, %s, %s, '…', {SNIPPET_TOKENS}),
+               bm25({POST_INDEX}, {TITLE_WEIGHT}, {TEXT_WEIGHT}) AS rank
+        FROM {POST_INDEX}
+        JOIN blog_post p ON p.id = {POST_INDEX}.rowid
+        WHERE {POST_INDEX} MATCH %s AND p.is_visible AND p.pub_date <= %s
+        ORDER BY rank
+        LIMIT %s OFFSET %s
+    """
+    marks = (HIGHLIGHT_START, HIGHLIGHT_END)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*marks, *marks, match, now, limit, offset))
+        return [SearchResult(*row) for row in cursor.fetchall()]
+
+
+def _search_fallback(query, limit, offset):
+    """Поиск без индекса для СУБД, отличных от SQLite"""
+    condition = Q()
+    for term in re.findall(r"\w+", query)[:MAX_QUERY_TERMS]:
+        condition &= Q(title__icontains=term) | Q(text__icontains=term)
+    posts = (
+        Post.objects.filter(
+            condition, is_visible=True, pub_date__lte=timezone.now()
+        )
+        .order_by(*FEED_ORDERING)
+        .values_list("pk", "title", "excerpt")[offset : offset + limit]
+    )
+    return [
+        SearchResult(pk, title, excerpt, 0) for pk, title, excerpt in posts
+    ]
+
+
+def search_posts(query, limit, offset=0):
+    """
+    Публикации, видимые всем, по запросу query в порядке релевантности
+    Результаты недолго кэшируются и сбрасываются при изменении публикаций
+    """
+    match = build_match(query)
+    if match is None:
+        return []
+    key = make_key(
+        SEARCH_KEY_PREFIX, (match, limit, offset), FEED_CACHE_SCOPES
+    )
+    results = cache.get(key)
+    if results is None:
+        if is_supported():
+            results = _search_index(match, limit, offset)
+        else:
+            results = _search_fallback(query, limit, offset)
+        cache.set(key, results, SEARCH_CACHE_TIMEOUT)
+    return results
+
+
+def rebuild_index():
+    """Перестраивает полнотекстовые индексы по содержимому таблиц"""
+    with connection.cursor() as cursor:
+        for index in (POST_INDEX, COMMENT_INDEX):
+            cursor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {index}({index}) VALUES ('optimize')")
+
+
+def install_triggers(connection):
+    """
+    Восстанавливает триггеры, поддерживающие индексы в актуальном
+    состоянии, если сами индексы созданы миграцией
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s)",
+            (POST_INDEX, COMMENT_INDEX),
+        )
+        if cursor.fetchone()[0] != 2:
+            return
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
@@ -0,0 +1,10 @@
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from .writes import serialized_write
+
+
+class SessionStore(DBStore):
+    """Сессии в базе, запись которых идёт через очередь записей блога"""
+
+    def save(self, must_create=False):
+        serialized_write(lambda: super(SessionStore, self).save(must_create))
@@ -0,0 +1,392 @@
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from .autocomplete import (
+    index_categories,
+    index_locations,
+    index_posts,
+    index_users,
+    remove_terms,
+)
+from .cache import invalidate, post_scopes
+from .db import apply_pragmas
+from .feed import sync_feed
+from .images import acquire_image, release_image, schedule_variants
+from .models import (
+    AutocompleteTerm,
+    Category,
+    Comment,
+    Location,
+    Page,
+    Post,
+    UploadSession,
+    next_version,
+)
+from .pagination import FEED_CACHE_SCOPES
+from .search import install_triggers
+from .uploads import remove_upload_file
+
+User = get_user_model()
+
+# Отправляется планировщиком, когда наступает время отложенных публикаций
+post_published = Signal()
+# Удаление, которое сейчас выполняется в этом потоке
+_current_deletion = ContextVar("blog_current_deletion", default=None)
+
+
+def change_comment_count(post_id, delta):
+    """Атомарно изменяет счётчик комментариев публикации"""
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F("comment_count") + delta, 0),
+        version=next_version(),
+    )
+
+
+def change_reply_count(post_id, paths, delta):
+    """Изменяет счётчики ответов комментариев с перечисленными путями"""
+    if paths:
+        Comment.objects.filter(post_id=post_id, path__in=paths).update(
+            reply_count=Greatest(F("reply_count") + delta, 0)
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw, **kwargs):
+    """Учитывает новый или перенесённый в другую публикацию комментарий"""
+    if raw:
+        return
+    loaded_post_id = getattr(instance, "_loaded_post_id", None)
+    if created:
+        change_comment_count(instance.post_id, 1)
+        if instance.parent_id:
+            # Путь нового комментария ещё не записан, предки — это
+            # родитель и его предки
+            parent = instance.parent
+            change_reply_count(
+                instance.post_id, [*parent.ancestor_paths(), parent.path], 1
+            )
+    elif loaded_post_id and loaded_post_id != instance.post_id:
+        change_comment_count(loaded_post_id, -1)
+        change_comment_count(instance.post_id, 1)
+    instance._loaded_post_id = instance.post_id
+
+
+def _deletion(origin):
+    """Сведения об удалении, начатом origin; новое заменяет прежнее"""
+    deletion = _current_deletion.get()
+    if deletion is None or deletion["origin"] is not origin:
+        deletion = {
+            "origin": origin,
+            "posts": set(),
+            "pending": 0,
+            "recount": set(),
+            "paths": set(),
+        }
+        _current_deletion.set(deletion)
+    return deletion
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, origin=None, **kwargs):
+    _deletion(origin)["posts"].add(instance.pk)
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_deleting(sender, instance, origin=None, **kwargs):
+    _deletion(origin)["pending"] += 1
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    """Пересчитывает счётчики, когда удалён последний из комментариев"""
+    deletion = _deletion(origin)
+    if instance.post_id not in deletion["posts"]:
+        deletion["recount"].add(instance.post_id)
+        deletion["paths"].update(instance.ancestor_paths())
+    deletion["pending"] -= 1
+    if deletion["pending"] > 0:
+        return
+    _current_deletion.set(None)
+    if deletion["recount"]:
+        recount_comments(deletion["recount"], deletion["paths"])
+
+
+def recount_comments(post_ids, paths):
+    """Пересчитывает счётчики комментариев и сбрасывает страницы"""
+    posts = Post.objects.filter(pk__in=post_ids)
+    posts.recount_comments()
+    if paths:
+        Comment.objects.filter(post_id__in=post_ids, path__in=paths).update(
+            reply_count=Coalesce(
+                Subquery(
+                    Comment.objects.filter(
+                        post_id=OuterRef("post_id"),
+                        path__startswith=OuterRef("path"),
+                    )
+                    .exclude(pk=OuterRef("pk"))
+                    .order_by()
+                    .values("post_id")
+                    .annotate(total=Count("pk"))
+                    .values("total")
+                ),
+                0,
+            )
+        )
+    invalidate(
+        *(f"post:{post_id}" for post_id in post_ids), *listing_scopes(posts)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_published)
+def feed_changed(sender, **kwargs):
+    """Сбрасывает закэшированные размеры лент"""
+    invalidate(*FEED_CACHE_SCOPES)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, raw, **kwargs):
+    """Обновляет запись публикации в ленте"""
+    posts = Post.objects.filter(pk=instance.pk)
+    if raw:
+        # При загрузке фикстур save() не вызывается — досчитываем флаги,
+        # анонс и HTML текста
+        instance.render_text()
+        posts.update(excerpt=instance.excerpt, text_html=instance.text_html)
+        posts.refresh_visibility()
+    sync_feed(posts)
+
+
+@receiver(pre_save, sender=Category)
+def category_changing(sender, instance, **kwargs):
+    """Запоминает, какие из видных в лентах полей категории изменились"""
+    loaded = getattr(instance, "_loaded_values", {})
+    instance._changed_fields = {
+        name
+        for name in Category.LISTED_FIELDS
+        if name not in loaded or loaded[name] != getattr(instance, name)
+    }
+    instance._loaded_values = {
+        name: getattr(instance, name) for name in Category.LISTED_FIELDS
+    }
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    """Пересчитывает видимость публикаций категории и ленту"""
+    if "is_published" not in instance._changed_fields:
+        return
+    posts = Post.objects.filter(category=instance)
+    posts.refresh_visibility()
+    sync_feed(posts)
+
+
+@receiver(post_save, sender=Location)
+def location_saved(sender, instance, **kwargs):
+    """Пересчитывает видимость местоположения в публикациях"""
+    Post.objects.filter(location=instance).refresh_visibility()
+
+
+def listing_scopes(posts):
+    """Области лент, в которых показываются переданные публикации"""
+    scopes = {"index"}
+    for category_id, author_id in (
+        posts.order_by().values_list("category_id", "author_id").distinct()
+    ):
+        scopes |= {f"category:{category_id}", f"author:{author_id}"}
+    return scopes
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    """Сбрасывает страницу публикации и все ленты, где она видна"""
+    invalidate(
+        "index",
+        f"category:{getattr(instance, '_loaded_category_id', None)}",
+        *post_scopes(instance),
+    )
+
+
+@receiver(post_published)
+def purge_published_pages(sender, posts, **kwargs):
+    invalidate(
+        "index", *(scope for post in posts for scope in post_scopes(post))
+    )
+
+
+@receiver(post_save, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    """Комментарий меняет страницу публикации и счётчики в лентах"""
+    invalidate(
+        f"post:{instance.post_id}",
+        *listing_scopes(Post.objects.filter(pk=instance.post_id)),
+    )
+
+
+@receiver(post_save, sender=Category)
+def purge_category_pages(sender, instance, **kwargs):
+    """Сбрасывает страницы, где видны изменённые поля категории"""
+    changed = instance._changed_fields
+    if not changed:
+        invalidate(f"category:{instance.pk}")
+        return
+    posts = Post.objects.filter(category=instance)
+    if "is_published" not in changed:
+        # Видимость не пересчитывалась, и версии карточек не менялись
+        posts.update(version=next_version())
+    invalidate(f"category:{instance.pk}", *listing_scopes(posts))
+
+
+@receiver(post_delete, sender=Category)
+def purge_deleted_category_pages(sender, instance, **kwargs):
+    invalidate(
+        f"category:{instance.pk}",
+        *listing_scopes(Post.objects.filter(category=instance)),
+    )
+
+
+@receiver(post_save, sender=Location)
+@receiver(pre_delete, sender=Location)
+def purge_location_pages(sender, instance, **kwargs):
+    invalidate(
+        f"location:{instance.pk}",
+        *listing_scopes(Post.objects.filter(location=instance)),
+    )
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def purge_static_page(sender, instance, **kwargs):
+    invalidate(f"page:{instance.pk}")
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def purge_user_pages(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает профиль, публикации и комментарии пользователя"""
+    # Обновление времени входа страниц не меняет
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    commented_posts = (
+        Comment.objects.filter(author=instance)
+        .order_by()
+        .values_list("post_id", flat=True)
+        .distinct()
+    )
+    posts = Post.objects.filter(author=instance)
+    posts.update(version=next_version())
+    invalidate(
+        f"author:{instance.pk}",
+        *listing_scopes(posts),
+        *(f"post:{post_id}" for post_id in commented_posts),
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post_title(sender, instance, **kwargs):
+    index_posts(Post.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def index_category_title(sender, instance, **kwargs):
+    """Видимость публикаций категории меняется вместе с ней"""
+    if instance._changed_fields:
+        index_categories(Category.objects.filter(pk=instance.pk))
+    if "is_published" in instance._changed_fields:
+        index_posts(Post.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Location)
+def index_location_name(sender, instance, **kwargs):
+    index_locations(Location.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=User)
+def index_username(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    index_users(User.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=User)
+def remove_autocomplete_term(sender, instance, **kwargs):
+    kind = {
+        Post: AutocompleteTerm.POST,
+        Category: AutocompleteTerm.CATEGORY,
+        Location: AutocompleteTerm.LOCATION,
+        User: AutocompleteTerm.USER,
+    }[sender]
+    remove_terms(kind, [instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def post_image_changed(sender, instance, raw, **kwargs):
+    if not raw and getattr(instance, "_image_changed", False):
+        schedule_variants(instance.pk)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, app_config, using, **kwargs):
+    if app_config.label == "blog":
+        install_triggers(connections[using])
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, **kwargs):
+    """Переносит ссылку публикации со старого файла изображения на новый"""
+    if "image" in instance.get_deferred_fields():
+        return
+    old = getattr(instance, "_loaded_image", None)
+    new = instance.image.name or None
+    if old == new:
+        return
+    if new:
+        try:
+            size = instance.image.size
+        except OSError:
+            size = 0
+        acquire_image(
+            new, size, getattr(instance, "_image_original_size", None)
+        )
+    if old:
+        release_image(old)
+    instance._loaded_image = new
+    instance._image_original_size = None
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    name = getattr(instance, "_loaded_image", instance.image.name)
+    if name:
+        release_image(name)
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_upload(sender, instance, **kwargs):
+    remove_upload_file(instance.token)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        apply_pragmas(connection)
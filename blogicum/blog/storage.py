@@ -0,0 +1,67 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+DIGEST_SHARD_LENGTH = 2
+TEMP_SUFFIX = ".part"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла — SHA-256 его содержимого:
+    <каталог>/<первые символы хэша>/<хэш><расширение>
+    Одинаковые загрузки хранятся один раз, а содержимое файла с данным
+    именем никогда не меняется, поэтому его можно долго кэшировать
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым, совпадение означает тот же файл
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        temp_dir = self.path(directory)
+        os.makedirs(temp_dir, exist_ok=True)
+        # Временный файл рядом с итоговым: переименование атомарно
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=TEMP_SUFFIX)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, "wb") as temp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = posixpath.join(
+                directory,
+                hexdigest[:DIGEST_SHARD_LENGTH],
+                hexdigest + extension,
+            )
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+                # Свежее время изменения не даёт сборщику мусора удалить
+                # файл, пока ссылка на него ещё не сохранена
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return image_storage
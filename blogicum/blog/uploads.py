@@ -0,0 +1,228 @@
+import hashlib
+import os
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.validators import get_available_image_extensions
+from django.utils import timezone
+
+from .models import UploadSession
+from .storage import TEMP_SUFFIX, image_storage
+
+try:
+    import fcntl
+except ImportError:  # Windows: одновременные части одной загрузки
+    fcntl = None  # не исключаются
+
+UPLOAD_DIR = "uploads"
+CHUNK_SIZE = 64 * 1024
+MAX_ACTIVE_UPLOADS = 10
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+SHA256 = re.compile(r"^[0-9a-f]{64}$")
+# Хэш-объекты нельзя сохранить в базе, поэтому состояние подсчёта
+# SHA-256 держится в памяти процесса; при промахе, например после
+# перезапуска, уже полученная часть файла хэшируется заново
+MAX_CACHED_DIGESTS = 128
+
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+class CompletedUpload(UploadedFile):
+    """Файл завершённой загрузки; читается с диска без копирования"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class UploadError(Exception):
+    """Запрос к загрузке отклонён; status — код ответа HTTP"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def upload_path(token):
+    return image_storage.path(f"{UPLOAD_DIR}/{token}{TEMP_SUFFIX}")
+
+
+def _take_digest(session):
+    with _digests_lock:
+        offset, digest = _digests.pop(session.token, (None, None))
+    if offset == session.received:
+        return digest
+    digest = hashlib.sha256()
+    with open(upload_path(session.token), "rb") as file:
+        remaining = session.received
+        while remaining:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def _keep_digest(token, offset, digest):
+    with _digests_lock:
+        _digests[token] = (offset, digest)
+        while len(_digests) > MAX_CACHED_DIGESTS:
+            _digests.popitem(last=False)
+
+
+def forget_digest(token):
+    with _digests_lock:
+        _digests.pop(token, None)
+
+
+def purge_expired():
+    """Удаляет загрузки, которые давно не продолжались"""
+    deadline = timezone.now() - timedelta(seconds=settings.BLOG_UPLOAD_EXPIRY)
+    for session in UploadSession.objects.filter(updated_at__lt=deadline):
+        session.delete()
+
+
+def start_upload(user, filename, size, sha256=""):
+    """Заводит загрузку файла filename размером size байт"""
+    filename = os.path.basename(filename or "")
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    if extension not in get_available_image_extensions():
+        raise UploadError("Можно загрузить только изображение")
+    if not 0 < size <= settings.BLOG_UPLOAD_MAX_SIZE:
+        raise UploadError(
+            f"Размер файла должен быть от 1 до"
+            f" {settings.BLOG_UPLOAD_MAX_SIZE} байт",
+            status=413,
+        )
+    sha256 = (sha256 or "").lower()
+    if sha256 and not SHA256.match(sha256):
+        raise UploadError("Неверная контрольная сумма SHA-256")
+    purge_expired()
+    active = user.upload_sessions.filter(completed_at__isnull=True).count()
+    if active >= MAX_ACTIVE_UPLOADS:
+        raise UploadError("Слишком много незавершённых загрузок", status=429)
+    session = UploadSession(
+        token=secrets.token_urlsafe(24),
+        user=user,
+        filename=filename,
+        size=size,
+        sha256=sha256,
+    )
+    path = upload_path(session.token)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    session.save()
+    return session
+
+
+def _try_lock(file):
+    """
+    Захватывает файл загрузки без ожидания; False, если его сейчас
+    пишет другой запрос, например оборвавшийся, но ещё не завершённый
+    """
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def parse_content_range(header):
+    """Первый и последний байт части и общий размер из Content-Range"""
+    match = CONTENT_RANGE.match(header or "")
+    if match is None:
+        raise UploadError("Нужен заголовок Content-Range: bytes a-b/размер")
+    first, last, total = map(int, match.groups())
+    if first > last:
+        raise UploadError("Неверный диапазон Content-Range", status=416)
+    return first, last, total
+
+
+def write_chunk(session, stream, first, last, total):
+    """
+    Дописывает часть [first, last] из потока stream сразу в файл,
+    обновляя SHA-256; часть должна начинаться с уже полученного
+    смещения, иначе клиенту сообщается, откуда продолжать
+    Если соединение оборвалось, дошедшие байты засчитываются
+    Пока часть пишется, файл загрузки заблокирован: повтор, пришедший
+    раньше, чем завершился оборвавшийся запрос, получает ответ 423
+    """
+    if session.is_complete:
+        raise UploadError("Загрузка уже завершена", status=409)
+    if total != session.size or last >= session.size:
+        raise UploadError("Диапазон вне файла", status=416)
+    with open(upload_path(session.token), "r+b") as file:
+        if not _try_lock(file):
+            raise UploadError(
+                "Загрузку сейчас продолжает другой запрос", status=423
+            )
+        # Под блокировкой смещение в базе точное: предыдущий запрос
+        # мог успеть дописать свою часть
+        session.refresh_from_db(fields=("received", "sha256", "completed_at"))
+        if session.is_complete:
+            raise UploadError("Загрузка уже завершена", status=409)
+        if first != session.received:
+            raise UploadError("Часть не с того места", status=409)
+        digest = _take_digest(session)
+        written = 0
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            file.write(chunk)
+            digest.update(chunk)
+            written += len(chunk)
+            remaining -= len(chunk)
+        received = first + written
+        file.truncate(received)
+        UploadSession.objects.filter(pk=session.pk).update(
+            received=received, updated_at=timezone.now()
+        )
+    session.received = received
+    if received < session.size:
+        _keep_digest(session.token, received, digest)
+        return session
+    checksum = digest.hexdigest()
+    if session.sha256 and session.sha256 != checksum:
+        session.delete()
+        raise UploadError("Контрольная сумма не совпала", status=422)
+    session.sha256 = checksum
+    session.completed_at = timezone.now()
+    session.save(update_fields=("sha256", "completed_at", "updated_at"))
+    return session
+
+
+def find_upload(user, token):
+    """Завершённая загрузка пользователя по токену или None"""
+    if not token or user is None or not user.is_authenticated:
+        return None
+    return UploadSession.objects.filter(
+        token=token, user=user, completed_at__isnull=False
+    ).first()
+
+
+def open_upload(session):
+    """Файл завершённой загрузки для передачи в поле формы"""
+    return CompletedUpload(
+        open(upload_path(session.token), "rb"),
+        name=session.filename,
+        size=session.size,
+    )
+
+
+def remove_upload_file(token):
+    forget_digest(token)
+    try:
+        os.remove(upload_path(token))
+    except FileNotFoundError:
+        pass
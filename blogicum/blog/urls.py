@@ -12,6 +12,17 @@ urlpatterns = [
         name="category_posts",
     ),
     path("profile/<username>/", views.profile, name="profile"),
+    path("search/", views.search, name="search"),
+    path("api/search/", views.search_api, name="search_api"),
+    path("api/autocomplete/", views.autocomplete, name="autocomplete"),
+    path("api/lookup/<str:kind>/", views.lookup_choices, name="lookup"),
+    path("api/uploads/", views.upload_create, name="uploads"),
+    path("api/uploads/<str:token>/", views.upload_detail, name="upload"),
+    path(
+        "comments/<int:comment_id>/reply/",
+        views.reply_to_comment,
+        name="reply_comment",
+    ),
     path(
         "posts/",
         include(
@@ -37,6 +48,11 @@ urlpatterns = [
                     views.add_comment_to_post,
                     name="add_comment",
                 ),
+                path(
+                    "<int:post_id>/comments/",
+                    views.post_comments,
+                    name="post_comments",
+                ),
                 path("create/", views.post_create, name="post_create"),
                 path("<int:post_id>/", views.post_detail, name="post_detail"),
             ]
@@ -1,13 +1,15 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.core.paginator import Paginator
-from django.db.models import Count
-from django.http import Http404
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_http_methods, require_POST
 from django.views.generic import (
     CreateView,
     DeleteView,
@@ -16,55 +18,179 @@ from django.views.generic import (
     UpdateView,
 )
 
+from .autocomplete import (
+    AUTOCOMPLETE_CACHE_TIMEOUT,
+    AUTOCOMPLETE_LIMIT,
+    LOOKUP_CACHE_SIZE,
+    lookup,
+    suggest,
+)
+from .cache import (
+    add_cache_scopes,
+    cache_anonymous_page,
+    conditional_page,
+    expire_page_at,
+    not_modified,
+    post_scopes,
+)
+from .feed import get_feed_queryset, next_feed_publication
 from .forms import CommentForm, PageForm, PostForm
-from .models import Category, Comment, Page, Post
+from .models import (
+    AutocompleteTerm,
+    Category,
+    Comment,
+    Page,
+    Post,
+    UploadSession,
+)
+from .pagination import (
+    COMMENT_ORDERING,
+    FEED_ORDERING,
+    CursorPaginator,
+    WindowedPaginator,
+)
+from .replicas import primary_reads, read_from_replica
+from .search import highlight, search_posts
+from .uploads import (
+    UploadError,
+    parse_content_range,
+    start_upload,
+    write_chunk,
+)
+from .writes import serialized_write
 
 User = get_user_model()
 
 POSTS_PER_PAGE_ON_INDEX = 10
 POSTS_PER_PAGE_USER_PROFILE = 10
+PAGINATION_LINKS = 5
+COMMENTS_PER_PAGE = 20
+SEARCH_RESULTS_PER_PAGE = 10
+LOOKUP_KINDS = (AutocompleteTerm.CATEGORY, AutocompleteTerm.LOCATION)
 
 
 def get_posts_queryset(
     apply_publication_filters=True, include_annotation_and_ordering=False
 ):
-    """Возвращает queryset объектов Post с различными настройками"""
-    qs = Post.objects.select_related("author", "category", "location")
+    """
+    Возвращает queryset объектов Post с различными настройками;
+    количество комментариев хранится в самой публикации, поэтому
+    include_annotation_and_ordering только упорядочивает ленту
+    """
+    qs = Post.objects.select_related(
+        "author", "category", "visible_location"
+    ).defer("text", "text_html")
 
     if apply_publication_filters:
-        qs = qs.filter(
-            pub_date__lte=timezone.now(),
-            is_published=True,
-            category__is_published=True,
-        )
+        qs = qs.filter(pub_date__lte=timezone.now(), is_visible=True)
 
     if include_annotation_and_ordering:
-        qs = qs.annotate(comment_count=Count("comments")).order_by("-pub_date")
+        qs = qs.order_by(*FEED_ORDERING)
 
     return qs
 
 
 def paginate_queryset(
-    queryset, per_page, request, num_links=POSTS_PER_PAGE_ON_INDEX
+    queryset, per_page, request, num_links=PAGINATION_LINKS, count_key=None
 ):
     """
     Создает и возвращает объект пагинатора для данного queryset
     num_links: Максимальное количество видимых ссылок на страницы в пагинации
+    count_key: Набор фильтров, под которым кэшируется общее количество
+    Параметры ?after= и ?before= включают курсорную пагинацию, стоимость
+    которой не зависит от глубины страницы
     """
-    paginator = Paginator(queryset, per_page)
+    after = request.GET.get("after")
+    before = request.GET.get("before")
+    if after or before:
+        return CursorPaginator(queryset, per_page).get_page(
+            after=after, before=before
+        )
+
+    # Дальше порога страницы листаются курсором, и ссылки на них
+    # по номеру со сканированием OFFSET не выводятся
+    paginator = WindowedPaginator(
+        queryset,
+        per_page,
+        num_links=num_links,
+        count_key=count_key,
+        max_linked_page=(
+            settings.BLOG_OFFSET_PAGINATION_PAGES
+            if settings.BLOG_CURSOR_PAGINATION
+            else None
+        ),
+    )
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
+    if (
+        settings.BLOG_CURSOR_PAGINATION
+        and page_obj.number >= settings.BLOG_OFFSET_PAGINATION_PAGES
+        and page_obj.has_next()
+    ):
+        page_obj.next_cursor = CursorPaginator(queryset, per_page).cursor_for(
+            page_obj[-1]
+        )
     return page_obj
 
 
+def attach_posts(page_obj):
+    """
+    Заменяет записи материализованной ленты на странице
+    самими публикациями в том же порядке
+    """
+    ids = [entry.pk for entry in page_obj]
+    posts = get_posts_queryset(apply_publication_filters=False).in_bulk(ids)
+    page_obj.object_list = [posts[pk] for pk in ids if pk in posts]
+    return page_obj
+
+
+def feed_not_modified(request, feed):
+    """
+    not_modified для страницы ленты: отложенная публикация меняет
+    ленту в момент pub_date, даже если области ещё не сброшены
+    """
+    expire_page_at(request, next_feed_publication())
+    return not_modified(request, feed)
+
+
+def get_visible_post(request, post_id):
+    """
+    Возвращает публикацию, если она видна пользователю:
+    автор видит свои публикации всегда, остальные — только опубликованные
+    """
+    post = get_object_or_404(
+        Post.objects.select_related("author", "category", "visible_location"),
+        pk=post_id,
+    )
+    is_hidden = not post.is_visible or post.pub_date > timezone.now()
+    if post.author != request.user and is_hidden:
+        raise Http404("Post not found or access denied.")
+    return post
+
+
+def paginate_comments(post, request):
+    """
+    Страница комментариев публикации после курсора ?after=:
+    ветки в порядке добавления, ответы сразу после своих родителей
+    """
+    return CursorPaginator(
+        Comment.objects.select_related("author").filter(post=post),
+        COMMENTS_PER_PAGE,
+        ordering=COMMENT_ORDERING,
+    ).get_page(after=request.GET.get("after"))
+
+
 @login_required
 def post_create(request):
     """Страница добавления новой публикации"""
-    form = PostForm(request.POST or None, request.FILES or None)
+    form = PostForm(
+        request.POST or None, request.FILES or None, user=request.user
+    )
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        serialized_write(post.save)
+        form.finish_upload()
         messages.success(request, f'Публикация "{post.title}" создана')
         return redirect("blog:profile", username=request.user.username)
 
@@ -81,9 +207,15 @@ def post_edit(request, post_id):
         messages.error(request, "У вас нет прав на редактирование этого поста")
         return redirect("blog:post_detail", post_id=post.pk)
 
-    form = PostForm(request.POST or None, request.FILES or None, instance=post)
+    form = PostForm(
+        request.POST or None,
+        request.FILES or None,
+        instance=post,
+        user=request.user,
+    )
     if form.is_valid():
-        form.save()
+        serialized_write(form.save)
+        form.finish_upload()
         messages.success(request, f'Публикация "{post.title}" обновлена')
         return redirect("blog:post_detail", post_id=post.pk)
 
@@ -109,61 +241,102 @@ def post_delete(request, post_id):
     return render(request, "blog/detail.html", context)
 
 
+@cache_anonymous_page
+@conditional_page
+@read_from_replica
 def post_list(request):
     """
     Отображает главную страницу блога
     со списком последних публикаций с пагинацией
     """
-    all_posts = get_posts_queryset(
-        apply_publication_filters=True, include_annotation_and_ordering=True
+    add_cache_scopes(request, "index")
+    feed = get_feed_queryset()
+    response = feed_not_modified(request, feed)
+    if response is not None:
+        return response
+    page_obj = attach_posts(
+        paginate_queryset(
+            feed,
+            POSTS_PER_PAGE_ON_INDEX,
+            request,
+            count_key=("index",),
+        )
     )
-    page_obj = paginate_queryset(all_posts, POSTS_PER_PAGE_ON_INDEX, request)
 
     context = {"page_obj": page_obj}
     return render(request, "blog/index.html", context)
 
 
+@cache_anonymous_page
+@conditional_page
+@read_from_replica
 def post_detail(request, post_id):
     """Отображает полную информацию о публикации и её комментарии"""
-    qs = Post.objects.select_related(
-        "author", "category", "location"
-    ).prefetch_related("comments", "comments__author")
-
-    post = get_object_or_404(qs, pk=post_id)
-
-    is_author = post.author == request.user
-    is_hidden = (
-        not post.is_published
-        or not post.category.is_published
-        or post.pub_date > timezone.now()
-    )
-
-    if not is_author and is_hidden:
-        raise Http404("Post not found or access denied.")
+    # Области страницы известны только после загрузки публикации,
+    # поэтому её читают из основной базы, а не из реплики
+    with primary_reads():
+        post = get_visible_post(request, post_id)
+    add_cache_scopes(request, *post_scopes(post))
+    response = not_modified(request)
+    if response is not None:
+        return response
 
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.select_related("author").filter(post=post)
 
     context = {
         "post": post,
         "form": form,
-        "comments": comments,
+        "comments": paginate_comments(post, request),
     }
     return render(request, "blog/detail.html", context)
 
 
+@cache_anonymous_page
+@conditional_page
+@read_from_replica
+def post_comments(request, post_id):
+    """
+    Фрагмент со следующей страницей комментариев публикации,
+    который подгружается на странице публикации
+    """
+    with primary_reads():
+        post = get_visible_post(request, post_id)
+    add_cache_scopes(request, *post_scopes(post))
+    response = not_modified(request)
+    if response is not None:
+        return response
+
+    context = {
+        "post": post,
+        "comments": paginate_comments(post, request),
+    }
+    return render(request, "includes/comments.html", context)
+
+
+@cache_anonymous_page
+@conditional_page
+@read_from_replica
 def post_list_by_category(request, category_slug):
     """Отображение публикаций в выбранной категории"""
-    category = get_object_or_404(
-        Category, slug=category_slug, is_published=True
+    with primary_reads():
+        category = get_object_or_404(
+            Category, slug=category_slug, is_published=True
+        )
+    add_cache_scopes(request, f"category:{category.pk}")
+    feed = get_feed_queryset().filter(category=category)
+    response = feed_not_modified(request, feed)
+    if response is not None:
+        return response
+
+    page_obj = attach_posts(
+        paginate_queryset(
+            feed,
+            POSTS_PER_PAGE_ON_INDEX,
+            request,
+            count_key=("category", category.pk),
+        )
     )
 
-    all_posts = get_posts_queryset(
-        apply_publication_filters=True, include_annotation_and_ordering=True
-    ).filter(category=category)
-
-    page_obj = paginate_queryset(all_posts, POSTS_PER_PAGE_ON_INDEX, request)
-
     context = {
         "category": category,
         "page_obj": page_obj,
@@ -171,18 +344,32 @@ def post_list_by_category(request, category_slug):
     return render(request, "blog/category.html", context)
 
 
+@cache_anonymous_page
+@conditional_page
+@read_from_replica
 def profile(request, username):
     """Отображение профиля пользователя с его публикациями"""
-    profile_object = get_object_or_404(User, username=username)
+    with primary_reads():
+        profile_object = get_object_or_404(User, username=username)
+    add_cache_scopes(request, f"author:{profile_object.pk}")
     should_filter_published = request.user != profile_object
 
     all_posts = get_posts_queryset(
         apply_publication_filters=should_filter_published,
         include_annotation_and_ordering=True,
     ).filter(author=profile_object)
+    if should_filter_published:
+        response = feed_not_modified(request, all_posts)
+    else:
+        response = not_modified(request)
+    if response is not None:
+        return response
 
     page_obj = paginate_queryset(
-        all_posts, POSTS_PER_PAGE_USER_PROFILE, request
+        all_posts,
+        POSTS_PER_PAGE_USER_PROFILE,
+        request,
+        count_key=("profile", profile_object.pk, should_filter_published),
     )
 
     context = {
@@ -192,6 +379,120 @@ def profile(request, username):
     return render(request, "blog/profile.html", context)
 
 
+def get_search_page(request):
+    """
+    Запрос, номер страницы, найденные на ней публикации
+    и признак следующей страницы
+    """
+    query = request.GET.get("q", "").strip()
+    try:
+        number = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        number = 1
+    results = search_posts(
+        query,
+        SEARCH_RESULTS_PER_PAGE + 1,
+        (number - 1) * SEARCH_RESULTS_PER_PAGE,
+    )
+    has_next = len(results) > SEARCH_RESULTS_PER_PAGE
+    return query, number, results[:SEARCH_RESULTS_PER_PAGE], has_next
+
+
+def search(request):
+    """Страница полнотекстового поиска по публикациям"""
+    query, number, results, has_next = get_search_page(request)
+    posts = get_posts_queryset(apply_publication_filters=False).in_bulk(
+        [result.post_id for result in results]
+    )
+    context = {
+        "query": query,
+        "results": [
+            {
+                "post": posts[result.post_id],
+                "title": highlight(result.title),
+                "snippet": highlight(result.snippet),
+            }
+            for result in results
+            if result.post_id in posts
+        ],
+        "number": number,
+        "has_next": has_next,
+    }
+    return render(request, "blog/search.html", context)
+
+
+def search_api(request):
+    """Полнотекстовый поиск по публикациям в формате JSON"""
+    query, number, results, has_next = get_search_page(request)
+    return JsonResponse(
+        {
+            "query": query,
+            "page": number,
+            "next_page": number + 1 if has_next else None,
+            "results": [
+                {
+                    "id": result.post_id,
+                    "url": reverse("blog:post_detail", args=(result.post_id,)),
+                    "title": highlight(result.title),
+                    "snippet": highlight(result.snippet),
+                    "rank": result.rank,
+                }
+                for result in results
+            ],
+        }
+    )
+
+
+def autocomplete(request):
+    """
+    Подсказки для поисковой строки в формате JSON;
+    ?kind= ограничивает типы подсказок: post, user, category
+    """
+    try:
+        limit = min(int(request.GET.get("limit", AUTOCOMPLETE_LIMIT)), 20)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    response = JsonResponse(
+        {
+            "results": suggest(
+                request.GET.get("q", ""),
+                kinds=request.GET.getlist("kind"),
+                limit=max(limit, 1),
+            )
+        }
+    )
+    patch_cache_control(
+        response, public=True, max_age=AUTOCOMPLETE_CACHE_TIMEOUT
+    )
+    return response
+
+
+def lookup_choices(request, kind):
+    """
+    Варианты для полей выбора категории и местоположения,
+    названия которых начинаются с ?q=
+    """
+    if kind not in LOOKUP_KINDS:
+        raise Http404("Unknown lookup.")
+    try:
+        limit = int(request.GET.get("limit", AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    response = JsonResponse(
+        {
+            "results": lookup(
+                kind,
+                request.GET.get("q", ""),
+                limit=min(max(limit, 1), LOOKUP_CACHE_SIZE),
+            )
+        }
+    )
+    patch_cache_control(
+        response, public=True, max_age=AUTOCOMPLETE_CACHE_TIMEOUT
+    )
+    return response
+
+
 @login_required
 def add_comment_to_post(request, post_id):
     """Обработка добавления комментария"""
@@ -202,12 +503,31 @@ def add_comment_to_post(request, post_id):
         comment = form.save(commit=False)
         comment.post = post
         comment.author = request.user
-        comment.save()
+        serialized_write(comment.save)
         messages.success(request, "Комментарий добавлен")
 
     return redirect("blog:post_detail", post_id=post.pk)
 
 
+@login_required
+def reply_to_comment(request, comment_id):
+    """Ответ на комментарий"""
+    parent = get_object_or_404(Comment, pk=comment_id)
+
+    form = CommentForm(request.POST or None)
+    if form.is_valid():
+        comment = form.save(commit=False)
+        comment.post_id = parent.post_id
+        comment.parent = parent
+        comment.author = request.user
+        serialized_write(comment.save)
+        messages.success(request, "Ответ добавлен")
+        return redirect("blog:post_detail", post_id=parent.post_id)
+
+    context = {"form": form, "comment": parent}
+    return render(request, "blog/comment.html", context)
+
+
 @login_required
 def edit_comment(request, post_id, comment_id):
     """Редактирование комментария"""
@@ -219,7 +539,7 @@ def edit_comment(request, post_id, comment_id):
 
     form = CommentForm(request.POST or None, instance=comment)
     if form.is_valid():
-        form.save()
+        serialized_write(form.save)
         messages.success(request, "Комментарий успешно обновлен")
         return redirect("blog:post_detail", post_id=post_id)
 
@@ -238,7 +558,7 @@ def delete_comment(request, post_id, comment_id):
         return redirect("blog:post_detail", post_id=post.pk)
 
     if request.method == "POST":
-        comment.delete()
+        serialized_write(comment.delete)
         messages.success(request, "Комментарий успешно удален")
         return redirect("blog:post_detail", post_id=post.pk)
 
@@ -265,6 +585,9 @@ class PageListView(StaffRequiredMixin, ListView):
     queryset = Page.objects.filter(is_published=True).order_by("title")
 
 
+@method_decorator(cache_anonymous_page, name="dispatch")
+@method_decorator(conditional_page, name="dispatch")
+@method_decorator(read_from_replica, name="dispatch")
 class PageDetailView(DetailView):
     """Просмотр одной статичной страницы"""
 
@@ -283,6 +606,19 @@ class PageDetailView(DetailView):
             return qs.filter(is_published=True)
         return qs
 
+    def get_object(self, queryset=None):
+        page = super().get_object(queryset)
+        add_cache_scopes(self.request, f"page:{page.pk}")
+        return page
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        response = not_modified(request)
+        if response is not None:
+            return response
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+
 
 class PageCreateView(StaffRequiredMixin, CreateView):
     """Создание новой статичной страницы"""
@@ -322,3 +658,72 @@ class PageDeleteView(StaffRequiredMixin, DeleteView):
         context["page"] = self.object
         context["action"] = "delete"
         return context
+
+
+def upload_state(session):
+    return {
+        "token": session.token,
+        "url": reverse("blog:upload", args=(session.token,)),
+        "offset": session.received,
+        "size": session.size,
+        "complete": session.is_complete,
+    }
+
+
+def upload_response(session, status=200):
+    response = JsonResponse(upload_state(session), status=status)
+    response.headers["Upload-Offset"] = session.received
+    return response
+
+
+def upload_error(error):
+    return JsonResponse({"error": str(error)}, status=error.status)
+
+
+@login_required
+@require_POST
+def upload_create(request):
+    """
+    Начинает загрузку изображения по частям: filename, size и
+    необязательный sha256; части отправляются на адрес из ответа
+    """
+    try:
+        size = int(request.POST.get("size", ""))
+    except ValueError:
+        return JsonResponse({"error": "Укажите размер файла"}, status=400)
+    try:
+        session = start_upload(
+            request.user,
+            request.POST.get("filename"),
+            size,
+            request.POST.get("sha256"),
+        )
+    except UploadError as error:
+        return upload_error(error)
+    return upload_response(session, status=201)
+
+
+@login_required
+@require_http_methods(["GET", "HEAD", "PUT", "DELETE"])
+def upload_detail(request, token):
+    """
+    GET — сколько байт уже получено, PUT с Content-Range — следующая
+    часть файла в теле запроса, DELETE — отмена загрузки
+    """
+    session = get_object_or_404(UploadSession, token=token, user=request.user)
+    if request.method == "DELETE":
+        session.delete()
+        return HttpResponse(status=204)
+    if request.method == "PUT":
+        try:
+            write_chunk(
+                session,
+                request,
+                *parse_content_range(request.headers.get("Content-Range")),
+            )
+        except UploadError as error:
+            response = upload_error(error)
+            if error.status == 409:
+                response.headers["Upload-Offset"] = session.received
+            return response
+    return upload_response(session)
@@ -0,0 +1,37 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Выпадающий список для ModelChoiceField, который выводит только
+    выбранное значение; остальные варианты скрипт подгружает
+    по мере ввода с адреса blog:lookup для вида подсказок kind
+    """
+
+    class Media:
+        js = ("js/autocomplete.js",)
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["attrs"]["data-autocomplete-url"] = reverse(
+            "blog:lookup", args=(self.kind,)
+        )
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        selected = [pk for pk in value if str(pk).isdigit()]
+        empty = [("", iterator.field.empty_label or "")]
+        self.choices = empty + [
+            iterator.choice(obj)
+            for obj in iterator.queryset.filter(pk__in=selected)
+        ]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
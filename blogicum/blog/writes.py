@@ -0,0 +1,213 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import (
+    OperationalError,
+    close_old_connections,
+    connection,
+    transaction,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: остаётся только очередь внутри процесса
+    fcntl = None
+
+LOCKED_ERRORS = ("database is locked", "database table is locked")
+
+logger = logging.getLogger(__name__)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def is_locked_error(error):
+    return isinstance(error, OperationalError) and any(
+        message in str(error) for message in LOCKED_ERRORS
+    )
+
+
+def backoff(attempt):
+    """Пауза перед повтором: растёт вдвое и случайно разбрасывается"""
+    return random.uniform(0, settings.BLOG_WRITE_RETRY_DELAY * 2**attempt)
+
+
+def retry_locked(func):
+    """
+    Выполняет func в транзакции и повторяет до BLOG_WRITE_RETRIES раз,
+    пока база занята другим писателем; внутри внешней транзакции
+    повторять нечего, и ошибка пробрасывается сразу
+    """
+    nested = connection.in_atomic_block
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic():
+                return func()
+        except OperationalError as error:
+            if (
+                nested
+                or not is_locked_error(error)
+                or attempt >= settings.BLOG_WRITE_RETRIES
+            ):
+                raise
+        time.sleep(backoff(attempt))
+        attempt += 1
+
+
+class FileLock:
+    """Блокировка записи между процессами через flock на файле"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            if self.file is None:
+                self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class WriteQueue:
+    """
+    Поток-писатель процесса: записи, пришедшие за BLOG_WRITE_BATCH_WINDOW,
+    фиксируются одной транзакцией под межпроцессной блокировкой; каждая
+    запись выполняется в своей точке сохранения, и ошибка одной из них
+    не отменяет остальные
+    """
+
+    def __init__(self, batch_size, window, lock_path):
+        self.batch_size = batch_size
+        self.window = window
+        self.lock = FileLock(lock_path)
+        self.tasks = queue.SimpleQueue()
+        self.commits = 0
+        self.thread = threading.Thread(
+            target=self.run, name="blog-writer", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, func):
+        future = Future()
+        self.tasks.put((func, future))
+        return future
+
+    def close(self):
+        self.tasks.put(None)
+        self.thread.join()
+
+    def collect(self):
+        batch = [self.tasks.get()]
+        deadline = time.monotonic() + self.window
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.tasks.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.collect()
+            stop = batch[-1] is None
+            tasks = [
+                task
+                for task in batch
+                if task is not None and task[1].set_running_or_notify_cancel()
+            ]
+            close_old_connections()
+            if tasks:
+                self.commit(tasks)
+            if stop:
+                self.lock.close()
+                connection.close()
+                return
+
+    def commit(self, tasks):
+        attempt = 0
+        while True:
+            try:
+                with self.lock, transaction.atomic():
+                    results = [self.apply(func) for func, _ in tasks]
+                break
+            except Exception as error:
+                if (
+                    not is_locked_error(error)
+                    or attempt >= settings.BLOG_WRITE_RETRIES
+                ):
+                    logger.warning("Не удалось записать пакет", exc_info=True)
+                    for _, future in tasks:
+                        future.set_exception(error)
+                    return
+            time.sleep(backoff(attempt))
+            attempt += 1
+        self.commits += 1
+        for (_, future), (result, error) in zip(tasks, results):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def apply(func):
+        try:
+            with transaction.atomic():
+                return func(), None
+        except Exception as error:
+            # Занятая база прерывает весь пакет, он повторится целиком
+            if is_locked_error(error):
+                raise
+            return None, error
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteQueue(
+                settings.BLOG_WRITE_BATCH_SIZE,
+                settings.BLOG_WRITE_BATCH_WINDOW,
+                settings.BLOG_WRITE_LOCK_FILE,
+            )
+    return _writer
+
+
+def _forget_writer():
+    # Поток-писатель не переживает fork, дочерний процесс заводит свой
+    global _writer
+    _writer = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_writer)
+
+
+def serialized_write(func):
+    """
+    Выполняет запись func: при BLOG_WRITE_QUEUE — в потоке-писателе
+    вместе с другими мелкими записями, иначе сразу; в обоих случаях
+    с повтором, пока база занята
+    Внутри транзакции вызывающего запись выполняется на месте
+    """
+    if not settings.BLOG_WRITE_QUEUE or connection.in_atomic_block:
+        return retry_locked(func)
+    return get_writer().submit(func).result()
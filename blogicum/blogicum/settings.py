@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,6 +34,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "blog.replicas.StickyPrimaryMiddleware",
 ]
 
 ROOT_URLCONF = "blogicum.urls"
@@ -66,6 +68,60 @@ DATABASES = {
     }
 }
 
+# Профиль базы данных задаётся переменной окружения BLOGICUM_DB_PROFILE;
+# "production" рассчитан на несколько процессов: журнал WAL не даёт
+# читателям ждать писателя, транзакции сразу берут блокировку записи,
+# соединения переиспользуются между запросами
+BLOG_DB_PROFILE = os.environ.get("BLOGICUM_DB_PROFILE", "development")
+# Выполняются как PRAGMA для каждого нового соединения SQLite
+BLOG_SQLITE_PRAGMAS = {}
+
+if BLOG_DB_PROFILE == "production":
+    DATABASES["default"].update(
+        CONN_MAX_AGE=600,
+        CONN_HEALTH_CHECKS=True,
+        OPTIONS={"transaction_mode": "IMMEDIATE", "timeout": 5},
+    )
+    BLOG_SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64 * 1024,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+# Запись через один поток-писатель на процесс и блокировку между
+# процессами; мелкие записи, например комментарии, фиксируются пакетами
+BLOG_WRITE_QUEUE = os.environ.get("BLOGICUM_WRITE_QUEUE", "") == "1"
+BLOG_WRITE_BATCH_SIZE = 32
+BLOG_WRITE_BATCH_WINDOW = 0.005
+BLOG_WRITE_LOCK_FILE = f"{DATABASES['default']['NAME']}.write-lock"
+# Повторы при «database is locked»: пауза до BLOG_WRITE_RETRY_DELAY * 2**n
+BLOG_WRITE_RETRIES = 5
+BLOG_WRITE_RETRY_DELAY = 0.05
+
+if BLOG_WRITE_QUEUE:
+    SESSION_ENGINE = "blog.sessions"
+
+# Реплики для чтения лент, публикаций, профилей и страниц; локально
+# реплику заменяет второй файл SQLite из BLOGICUM_READ_REPLICA, который
+# обновляет manage.py sync_replica
+BLOG_READ_REPLICAS = []
+if os.environ.get("BLOGICUM_READ_REPLICA"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["BLOGICUM_READ_REPLICA"],
+        "TEST": {"MIRROR": "default"},
+    }
+    BLOG_READ_REPLICAS = ["replica"]
+DATABASE_ROUTERS = ["blog.replicas.ReplicaRouter"]
+# Реплика, отставшая сильнее, не используется, с
+BLOG_REPLICA_MAX_LAG = 30
+# Сколько после своей записи пользователь читает только данные, в которых
+# она уже есть: основную базу или догнавшую реплику, с
+BLOG_PRIMARY_STICKY_SECONDS = 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -113,3 +169,39 @@ CSRF_FAILURE_VIEW = "pages.views.custom_403"
 LOGIN_URL = "login"
 
 LOGIN_REDIRECT_URL = "blog:index"
+
+# Курсорная пагинация лент: после BLOG_OFFSET_PAGINATION_PAGES страниц
+# ссылка «вперёд» переходит с ?page=N на ?after=<курсор>
+BLOG_CURSOR_PAGINATION = False
+BLOG_OFFSET_PAGINATION_PAGES = 5
+
+
+# Кэш страниц для анонимных посетителей; 0 отключает его
+# Версии областей кэша хранятся в том же кэше; при нескольких процессах
+# (gunicorn, run_scheduler) он должен быть общим — Redis, Memcached или
+# база, иначе сброс в одном процессе не увидят другие (проверка blog.W002)
+BLOG_PAGE_CACHE_ALIAS = "default"
+BLOG_PAGE_CACHE_TIMEOUT = 300
+
+# Насколько далеко в прошлое первый запуск run_scheduler ищет
+# наступившие публикации, с; дальше он продолжает с прошлого запуска
+BLOG_SCHEDULER_LOOKBACK = 24 * 60 * 60
+
+# Уменьшенные копии изображений публикаций готовятся в фоновых потоках
+BLOG_IMAGE_VARIANTS = True
+BLOG_IMAGE_WORKERS = 2
+# Загружаемые оригиналы уменьшаются до этого размера по большей стороне
+# и пережимаются с этим качеством JPEG
+BLOG_IMAGE_MAX_SIZE = 2560
+BLOG_IMAGE_QUALITY = 85
+# Загрузка изображений по частям: предельный размер файла и сколько
+# хранится загрузка, которую не продолжают
+BLOG_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+BLOG_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Раздача медиафайлов: "" — сам Django, "x-accel-redirect" (nginx)
+# или "x-sendfile" (Apache, lighttpd) — передача файла фронтовому серверу
+BLOG_MEDIA_SENDFILE = ""
+BLOG_MEDIA_ACCEL_PREFIX = "/protected-media/"
+# Сколько кэшировать файлы, имя которых не из хэша содержимого
+BLOG_MEDIA_MAX_AGE = 60 * 60
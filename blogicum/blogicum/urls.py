@@ -1,7 +1,9 @@
+import re
+
+from blog.media import serve_media
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -19,7 +21,11 @@ handler404 = "pages.views.custom_404"
 handler500 = "pages.views.custom_500"
 handler403 = "pages.views.custom_403"
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
+if not settings.MEDIA_URL.startswith(("http://", "https://", "//")):
+    urlpatterns.append(
+        re_path(
+            rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.*)$",
+            serve_media,
+            name="media",
+        )
     )
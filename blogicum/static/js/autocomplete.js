@@ -0,0 +1,49 @@
+// Поле поиска над выпадающими списками с data-autocomplete-url:
+// варианты подгружаются по мере ввода, выбранное значение сохраняется
+const AUTOCOMPLETE_DELAY = 200;
+
+function replaceOptions(select, results) {
+  const keep = Array.from(select.options).filter(
+    (option) => option.value === "" || option.selected
+  );
+  select.replaceChildren(...keep);
+  const present = new Set(keep.map((option) => option.value));
+  for (const { id, label } of results) {
+    if (!present.has(String(id))) {
+      select.add(new Option(label, id));
+    }
+  }
+}
+
+function attachAutocomplete(select) {
+  const input = document.createElement("input");
+  input.type = "search";
+  input.className = "form-control form-control-sm mb-1";
+  input.placeholder = "Начните вводить название";
+  input.setAttribute("aria-label", input.placeholder);
+  select.before(input);
+
+  let timer = null;
+  let controller = null;
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    timer = setTimeout(() => {
+      if (controller) {
+        controller.abort();
+      }
+      controller = new AbortController();
+      const url = new URL(select.dataset.autocompleteUrl, window.location.href);
+      url.searchParams.set("q", input.value);
+      fetch(url, { signal: controller.signal })
+        .then((response) => response.json())
+        .then((data) => replaceOptions(select, data.results))
+        .catch(() => {});
+    }, AUTOCOMPLETE_DELAY);
+  });
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+  document
+    .querySelectorAll("select[data-autocomplete-url]")
+    .forEach(attachAutocomplete);
+});
@@ -0,0 +1,21 @@
+// Подгружает следующую страницу комментариев вместо ссылки «Показать ещё»
+document.addEventListener("click", (event) => {
+  const link = event.target.closest("[data-comments-fragment]");
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.commentsFragment, { credentials: "same-origin" })
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.text();
+    })
+    .then((html) => {
+      link.closest(".comments-more").outerHTML = html;
+    })
+    .catch(() => {
+      window.location.href = link.href;
+    });
+});
@@ -0,0 +1,103 @@
+// Изображение публикации загружается по частям сразу после выбора файла;
+// после обрыва связи загрузка продолжается с последнего полученного байта,
+// а форма отправляет только токен готовой загрузки
+const UPLOAD_CHUNK_SIZE = 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+
+function csrfToken(form) {
+  return form.querySelector("[name=csrfmiddlewaretoken]").value;
+}
+
+function sleep(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+async function sendChunks(file, state, headers, onProgress) {
+  let offset = state.offset;
+  let failures = 0;
+  while (offset < file.size) {
+    const last = Math.min(offset + UPLOAD_CHUNK_SIZE, file.size) - 1;
+    try {
+      const response = await fetch(state.url, {
+        method: "PUT",
+        headers: {
+          ...headers,
+          "Content-Range": `bytes ${offset}-${last}/${file.size}`,
+        },
+        body: file.slice(offset, last + 1),
+      });
+      if (!response.ok && response.status !== 409) {
+        throw new Error((await response.json()).error);
+      }
+      offset = Number(response.headers.get("Upload-Offset"));
+      failures = 0;
+      onProgress(offset / file.size);
+    } catch (error) {
+      failures += 1;
+      if (failures > UPLOAD_RETRIES) {
+        throw error;
+      }
+      await sleep(1000 * 2 ** failures);
+      // Сервер мог принять часть данных до обрыва
+      const response = await fetch(state.url, { headers });
+      offset = (await response.json()).offset;
+    }
+  }
+}
+
+function attachUpload(hidden) {
+  const form = hidden.form;
+  const input = form.querySelector("input[type=file][name=image]");
+  if (!input) {
+    return;
+  }
+  const status = document.createElement("div");
+  status.className = "form-text";
+  input.after(status);
+  let uploading = null;
+
+  input.addEventListener("change", () => {
+    const file = input.files[0];
+    hidden.value = "";
+    if (!file) {
+      return;
+    }
+    const headers = { "X-CSRFToken": csrfToken(form) };
+    const body = new FormData();
+    body.append("filename", file.name);
+    body.append("size", file.size);
+    uploading = fetch(hidden.dataset.uploadUrl, {
+      method: "POST",
+      headers,
+      body,
+    })
+      .then(async (response) => {
+        const state = await response.json();
+        if (!response.ok) {
+          throw new Error(state.error);
+        }
+        await sendChunks(file, state, headers, (share) => {
+          status.textContent = `Загружено ${Math.floor(share * 100)}%`;
+        });
+        hidden.value = state.token;
+        // Файл уже на сервере, повторно с формой он не отправляется
+        input.value = "";
+        status.textContent = `Загружено: ${file.name}`;
+      })
+      .catch((error) => {
+        status.textContent = `Не удалось загрузить файл: ${error.message}`;
+      })
+      .finally(() => {
+        uploading = null;
+      });
+  });
+
+  form.addEventListener("submit", (event) => {
+    if (uploading) {
+      event.preventDefault();
+      uploading.then(() => form.requestSubmit());
+    }
+  });
+}
+
+document.querySelectorAll("input[data-upload-url]").forEach(attachUpload);
@@ -19,6 +19,7 @@ from typing import (
 import pytest
 from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.db.models import Field, Model
 from django.forms import BaseForm
 from django.http import HttpResponse
@@ -41,6 +42,21 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def disable_image_variants():
+    # Фоновые потоки не должны писать файлы в MEDIA_ROOT во время тестов
+    with override_settings(BLOG_IMAGE_VARIANTS=False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Кэш не откатывается вместе с базой данных после теста
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
 class SafeImportFromContextManager:
     def __init__(
         self,
@@ -101,6 +117,14 @@ def mixer():
     return _mixer
 
 
+@pytest.fixture
+def media_root(settings, tmp_path):
+    # Файлы, которые пишут тесты изображений, не попадают в настоящий
+    # MEDIA_ROOT
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
 @pytest.fixture
 def user(mixer):
     User = get_user_model()
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from blog import autocomplete
+from blog.models import AutocompleteTerm
+from django.core.management import call_command
+from django.db.models import Model
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def labels(client, query, **params):
+    response = client.get("/api/autocomplete/", {"q": query, **params})
+    return [result["label"] for result in response.json()["results"]]
+
+
+def test_autocomplete_tolerates_typos(
+    client, mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    post.title = "Путешествие на Байкал"
+    post.save()
+    mixer.blend("blog.Post", title="Рецепт борща", category=post.category)
+
+    assert (
+        labels(client, "путешес")[0] == post.title
+    ), "Убедитесь, что подсказки находят заголовок по началу слова."
+    assert post.title in labels(
+        client, "путишествие", kind="post"
+    ), "Убедитесь, что подсказки находят заголовок с опечаткой."
+    assert labels(client, "путешествие", kind="category") == []
+
+
+def test_autocomplete_follows_visibility(
+    client, user, post_with_published_location: Model
+):
+    post = post_with_published_location
+    post.title = "Скрытый заголовок"
+    post.is_published = False
+    post.save()
+    assert post.title not in labels(client, "скрытый")
+
+    post.is_published = True
+    post.pub_date = timezone.now() + timedelta(days=1)
+    post.save()
+    assert post.title not in labels(
+        client, "скрытый"
+    ), "Убедитесь, что отложенные публикации не попадают в подсказки."
+    assert user.username in labels(client, user.username, kind="user")
+
+
+def test_rebuild_autocomplete(post_with_published_location: Model):
+    AutocompleteTerm.objects.all().delete()
+    call_command("rebuild_autocomplete", stdout=StringIO())
+    assert AutocompleteTerm.objects.filter(
+        kind=AutocompleteTerm.POST,
+        object_id=post_with_published_location.pk,
+    ).exists()
+
+
+def test_common_trigrams_are_capped(
+    monkeypatch, django_assert_max_num_queries
+):
+    monkeypatch.setattr(autocomplete, "MAX_POSTINGS_PER_GRAM", 5)
+    monkeypatch.setattr(autocomplete, "MAX_CANDIDATES", 5)
+    autocomplete.index_terms(
+        AutocompleteTerm.CATEGORY,
+        [],
+        [
+            *(
+                AutocompleteTerm(object_id=i, label=f"Прогулка {i}")
+                for i in range(1, 31)
+            ),
+            AutocompleteTerm(object_id=100, label="Прогноз погоды"),
+        ],
+    )
+    with django_assert_max_num_queries(3):
+        results = autocomplete.suggest("прогноз", kinds=["category"])
+    assert [result["id"] for result in results][:1] == [100], (
+        "Убедитесь, что кандидаты подсказок берутся с редких триграмм"
+        " запроса, а частые читаются не целиком."
+    )
+
+
+def test_exact_match_survives_capped_trigrams(django_assert_max_num_queries):
+    autocomplete.index_terms(
+        AutocompleteTerm.POST,
+        [],
+        [
+            *(
+                AutocompleteTerm(
+                    object_id=i, label=f"django tutorial advanced part {i}"
+                )
+                for i in range(1, 261)
+            ),
+            AutocompleteTerm(object_id=1000, label="django tutorial"),
+            AutocompleteTerm(object_id=1001, label="a django tutorial"),
+        ],
+    )
+    with django_assert_max_num_queries(3):
+        results = autocomplete.suggest("django tutorial", kinds=["post"])
+    assert [result["id"] for result in results][:2] == [1000, 1001], (
+        "Убедитесь, что точное совпадение попадает в подсказки, даже если"
+        " все триграммы запроса частые и добавлено позже похожих подписей."
+    )
@@ -0,0 +1,57 @@
+import pytest
+from django.db.models import Model
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_post_form_renders_only_selected_choices(
+    user_client, mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    mixer.cycle(30).blend("blog.Location", is_published=True)
+    mixer.cycle(30).blend("blog.Category", is_published=True)
+    post.author = user_client.get("/").wsgi_request.user
+    post.save()
+
+    content = user_client.get(f"/posts/{post.id}/edit/").content.decode()
+    assert content.count("<option") == 4, (
+        "Убедитесь, что поля категории и местоположения выводят только"
+        " пустой вариант и выбранное значение."
+    )
+    assert "data-autocomplete-url" in content
+
+
+def test_lookup_matches_prefix(client, mixer: Mixer):
+    mixer.blend("blog.Location", name="Санкт-Петербург", is_published=True)
+    mixer.blend("blog.Location", name="Самара", is_published=True)
+    mixer.blend("blog.Location", name="Москва", is_published=True)
+    mixer.blend("blog.Location", name="Саратов", is_published=False)
+
+    response = client.get("/api/lookup/location/", {"q": "са"})
+    assert [item["label"] for item in response.json()["results"]] == [
+        "Самара",
+        "Санкт-Петербург",
+    ], (
+        "Убедитесь, что поиск местоположений выдаёт опубликованные"
+        " названия, начинающиеся с введённой строки."
+    )
+    assert client.get("/api/lookup/user/").status_code == 404
+
+
+def test_lookup_sees_new_and_republished_choices(client, mixer: Mixer):
+    def labels():
+        response = client.get("/api/lookup/category/", {"q": "пу"})
+        return [item["label"] for item in response.json()["results"]]
+
+    mixer.blend("blog.Category", title="Путешествия", is_published=True)
+    assert labels() == ["Путешествия"]
+
+    mixer.blend("blog.Category", title="Путеводители", is_published=True)
+    hidden = mixer.blend("blog.Category", title="Пушкин", is_published=False)
+    hidden.is_published = True
+    hidden.save()
+    assert labels() == ["Путеводители", "Путешествия", "Пушкин"], (
+        "Убедитесь, что новая или снова опубликованная категория сразу"
+        " находится в поле выбора, а не после истечения кэша подсказок."
+    )
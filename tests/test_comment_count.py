@@ -0,0 +1,103 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Model
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_comment_count_follows_comments(
+    mixer: Mixer, user_client, post_with_published_location: Model
+):
+    post = post_with_published_location
+    user_client.post(f"/posts/{post.id}/comment/", data={"text": "Первый"})
+    comments = mixer.cycle(2).blend("blog.Comment", post=post)
+    post.refresh_from_db()
+    assert post.comment_count == 3, (
+        "Убедитесь, что счётчик комментариев публикации увеличивается"
+        " при добавлении комментария."
+    )
+
+    comments[0].delete()
+    post.comments.all().delete()
+    post.refresh_from_db()
+    assert post.comment_count == 0, (
+        "Убедитесь, что счётчик комментариев публикации уменьшается"
+        " при удалении комментариев, в том числе массовом."
+    )
+
+
+def test_recount_comments_repairs_drift(
+    mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    type(post).objects.filter(pk=post.pk).update(comment_count=7)
+
+    call_command("recount_comments", batch_size=1, stdout=StringIO())
+
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что команда `recount_comments` исправляет"
+        " рассинхронизированные счётчики комментариев."
+    )
+
+
+def test_post_delete_does_not_touch_counters_per_comment(
+    mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    posts = mixer.cycle(2).blend(
+        type(post),
+        author=post.author,
+        category=post.category,
+        location=post.location,
+    )
+    mixer.cycle(3).blend("blog.Comment", post=posts[0])
+    mixer.cycle(30).blend("blog.Comment", post=posts[1])
+
+    with CaptureQueriesContext(connection) as few:
+        posts[0].delete()
+    with CaptureQueriesContext(connection) as many:
+        posts[1].delete()
+    assert len(many) == len(few), (
+        "Убедитесь, что при удалении публикации её комментарии не"
+        " обновляют счётчики и кэш по одному."
+    )
+
+
+def test_bulk_delete_recounts_once_per_post(
+    mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    other = mixer.blend(
+        type(post),
+        author=post.author,
+        category=post.category,
+        location=post.location,
+    )
+    root = mixer.blend("blog.Comment", post=post)
+    replies = [
+        mixer.blend("blog.Comment", post=post, parent=root) for _ in range(10)
+    ]
+    mixer.cycle(10).blend("blog.Comment", post=other)
+    kept = mixer.blend("blog.Comment", post=other)
+
+    Comment = type(root)
+    with CaptureQueriesContext(connection) as few:
+        Comment.objects.filter(pk=replies[0].pk).delete()
+    with CaptureQueriesContext(connection) as many:
+        Comment.objects.exclude(pk__in=[root.pk, kept.pk]).delete()
+    assert len(many) <= len(few) + 2, (
+        "Убедитесь, что массовое удаление комментариев пересчитывает"
+        " счётчики один раз на публикацию."
+    )
+    post.refresh_from_db()
+    other.refresh_from_db()
+    root.refresh_from_db()
+    assert (post.comment_count, root.reply_count) == (1, 0)
+    assert other.comment_count == 1
@@ -0,0 +1,49 @@
+import re
+
+import pytest
+from django.db.models import Model
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def comment_ids(content):
+    return [int(i) for i in re.findall(r'name="comment_(\d+)"', content)]
+
+
+def test_comments_are_paginated_with_fragment(
+    user_client, mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    comments = mixer.cycle(25).blend("blog.Comment", post=post)
+    expected = [comment.id for comment in comments]
+
+    response = user_client.get(f"/posts/{post.id}/")
+    page = response.context["comments"]
+    assert comment_ids(response.content.decode()) == expected[:20], (
+        "Убедитесь, что на странице публикации выводится только первая"
+        " страница комментариев."
+    )
+
+    fragment = user_client.get(
+        f"/posts/{post.id}/comments/?after={page.next_cursor}"
+    )
+    content = fragment.content.decode()
+    assert comment_ids(content) == expected[20:], (
+        "Убедитесь, что следующая страница комментариев отдаётся"
+        " отдельным фрагментом."
+    )
+    assert "<html" not in content and "Показать ещё" not in content
+
+
+def test_hidden_post_comments_are_not_found(
+    client, mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    mixer.blend("blog.Comment", post=post)
+    post.is_published = False
+    post.save()
+    response = client.get(f"/posts/{post.id}/comments/")
+    assert response.status_code == 404, (
+        "Убедитесь, что комментарии скрытой публикации недоступны."
+    )
@@ -0,0 +1,77 @@
+import pytest
+from blog.models import Comment
+from django.db.models import Model
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def reply(client, comment, text):
+    client.post(f"/comments/{comment.id}/reply/", data={"text": text})
+    return Comment.objects.get(text=text)
+
+
+def test_replies_follow_their_parents(
+    user_client, mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    first, second = mixer.cycle(2).blend("blog.Comment", post=post)
+    answer = reply(user_client, first, "Ответ на первый")
+    nested = reply(user_client, answer, "Ответ на ответ")
+
+    ordered = list(
+        Comment.objects.filter(post=post)
+        .order_by("path")
+        .values_list("id", flat=True)
+    )
+    assert ordered == [first.id, answer.id, nested.id, second.id], (
+        "Убедитесь, что ответы выводятся сразу после комментария,"
+        " на который отвечают."
+    )
+    assert (nested.post_id, nested.depth) == (post.id, 2)
+
+    first.refresh_from_db()
+    answer.refresh_from_db()
+    assert (first.reply_count, answer.reply_count) == (
+        2,
+        1,
+    ), "Убедитесь, что счётчики ответов учитывают всю ветку."
+
+    answer.delete()
+    first.refresh_from_db()
+    post.refresh_from_db()
+    assert (first.reply_count, post.comment_count) == (
+        0,
+        2,
+    ), "Убедитесь, что при удалении ветки счётчики уменьшаются."
+
+
+def test_comment_tree_is_one_query(
+    user_client,
+    mixer: Mixer,
+    django_assert_num_queries,
+    post_with_published_location: Model,
+):
+    post = post_with_published_location
+    root = mixer.blend("blog.Comment", post=post)
+    for i in range(3):
+        root = reply(user_client, root, f"Ответ {i}")
+    with django_assert_num_queries(4):
+        # сессия, пользователь, публикация и ветка комментариев
+        user_client.get(f"/posts/{post.id}/comments/")
+
+
+def test_comment_is_not_saved_without_path(
+    monkeypatch, user, post_with_published_location: Model
+):
+    def broken_segment(pk):
+        raise RuntimeError("Сбой после вставки")
+
+    monkeypatch.setattr(Comment, "path_segment", staticmethod(broken_segment))
+    with pytest.raises(RuntimeError):
+        Comment(
+            post=post_with_published_location, author=user, text="Без пути"
+        ).save()
+    assert not Comment.objects.filter(text="Без пути").exists(), (
+        "Убедитесь, что комментарий и его путь сохраняются одной транзакцией."
+    )
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.db.models import Model
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_post_detail_answers_not_modified(
+    user_client,
+    mixer: Mixer,
+    django_assert_max_num_queries,
+    post_with_published_location: Model,
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    response = user_client.get(url)
+    etag = response.get("ETag")
+    assert etag and response.has_header("Last-Modified"), (
+        "Убедитесь, что страница публикации отдаёт заголовки ETag"
+        " и Last-Modified."
+    )
+
+    with django_assert_max_num_queries(3) as context:
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304, (
+        "Убедитесь, что на запрос с актуальным ETag возвращается"
+        " код ответа 304."
+    )
+    assert not any(
+        "blog_comment" in query["sql"] for query in context.captured_queries
+    ), "Убедитесь, что ответ 304 отдаётся без запроса комментариев."
+
+    mixer.blend("blog.Comment", post=post)
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200, (
+        "Убедитесь, что после добавления комментария ETag страницы меняется."
+    )
+
+
+@pytest.mark.parametrize("url", ["/", "/profile/{username}/"])
+def test_lists_answer_not_modified(
+    client, post_with_published_location: Model, url
+):
+    url = url.format(username=post_with_published_location.author.username)
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_etag_depends_on_user(
+    client, user_client, post_with_published_location: Model
+):
+    url = f"/profile/{post_with_published_location.author.username}/"
+    etag = client.get(url)["ETag"]
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200, (
+        "Убедитесь, что ETag страницы различается для разных пользователей."
+    )
+
+
+@pytest.mark.parametrize("client_name", ["client", "user_client"])
+def test_scheduled_post_changes_lists_without_scheduler(
+    request,
+    monkeypatch,
+    mixer: Mixer,
+    post_with_published_location: Model,
+    client_name,
+):
+    client = request.getfixturevalue(client_name)
+    post = post_with_published_location
+    scheduled = mixer.blend(
+        "blog.Post",
+        author=post.author,
+        category=post.category,
+        is_published=True,
+        pub_date=timezone.now() + timedelta(minutes=1),
+    )
+    etag = client.get("/")["ETag"]
+
+    # Время публикации наступило, а планировщик не запускался
+    shift = timedelta(minutes=2).total_seconds()
+    real_time, real_now = time.time, timezone.now
+    monkeypatch.setattr(time, "time", lambda: real_time() + shift)
+    monkeypatch.setattr(
+        timezone, "now", lambda: real_now() + timedelta(seconds=shift)
+    )
+    response = client.get("/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200, (
+        "Убедитесь, что ETag ленты меняется, когда наступает время"
+        " отложенной публикации."
+    )
+    assert scheduled.title in response.content.decode()
@@ -0,0 +1,26 @@
+import pytest
+from blog.db import active_pragmas, apply_pragmas, check_sqlite_settings
+from django.db import connection
+
+
+@pytest.mark.django_db
+def test_pragmas_are_applied_and_checked(settings):
+    settings.BLOG_SQLITE_PRAGMAS = {
+        "busy_timeout": "1234",
+        "cache_size": -4096,
+    }
+    apply_pragmas(connection)
+    assert active_pragmas(connection, ("busy_timeout", "cache_size")) == {
+        "busy_timeout": "1234",
+        "cache_size": "-4096",
+    }, "Убедитесь, что настройки SQLite применяются к соединению."
+
+    messages = check_sqlite_settings(databases=["default"])
+    assert [message.id for message in messages] == ["blog.I001"]
+    assert "busy_timeout=1234" in messages[0].msg
+
+    settings.BLOG_SQLITE_PRAGMAS = {"synchronous": "OFF"}
+    messages = check_sqlite_settings(databases=["default"])
+    assert "blog.W001" in [
+        message.id for message in messages
+    ], "Убедитесь, что проверка сообщает о расхождении настроек."
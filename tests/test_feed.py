@@ -0,0 +1,48 @@
+from io import StringIO
+
+import pytest
+from blog.models import FeedEntry
+from django.core.management import call_command
+from django.db.models import Model
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_feed_follows_posts_and_categories(
+    post_with_published_location: Model,
+):
+    post = post_with_published_location
+    entry = FeedEntry.objects.get(pk=post.pk)
+    assert (entry.pub_date, entry.category_id) == (
+        post.pub_date,
+        post.category_id,
+    )
+
+    post.category.is_published = False
+    post.category.save()
+    assert not FeedEntry.objects.filter(
+        pk=post.pk
+    ).exists(), (
+        "Убедитесь, что публикации скрытой категории убираются из ленты."
+    )
+
+    post.category.is_published = True
+    post.category.save()
+    assert FeedEntry.objects.filter(pk=post.pk).exists()
+
+    post.is_published = False
+    post.save()
+    assert not FeedEntry.objects.filter(
+        pk=post.pk
+    ).exists(), "Убедитесь, что снятая с публикации запись убирается из ленты."
+
+
+def test_rebuild_feed(post_with_published_location: Model):
+    post = post_with_published_location
+    FeedEntry.objects.all().delete()
+
+    call_command("rebuild_feed", batch_size=1, stdout=StringIO())
+
+    assert FeedEntry.objects.filter(
+        pk=post.pk
+    ).exists(), "Убедитесь, что команда `rebuild_feed` восстанавливает ленту."
@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from blog.images import recompress
+from blog.models import ImageBlob
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Model
+from PIL import Image, ImageCms
+
+pytestmark = [pytest.mark.django_db]
+
+
+def photo(size, orientation=None, fmt="JPEG", name="photo.jpg"):
+    buffer = io.BytesIO()
+    image = Image.new("RGB", size, "orange")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+        exif[0x010F] = "Camera"
+    image.save(buffer, format=fmt, exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+def test_recompress_rotates_and_strips_metadata(settings):
+    settings.BLOG_IMAGE_MAX_SIZE = 500
+    upload = recompress(photo((1200, 600), orientation=6))
+    image = Image.open(upload)
+    assert image.size == (
+        250,
+        500,
+    ), "Убедитесь, что изображение поворачивается по EXIF и уменьшается."
+    assert not image.getexif(), "Убедитесь, что метаданные удаляются."
+    assert upload.name == "photo.jpg"
+
+
+@pytest.mark.parametrize(
+    "mode,expected_mode,keeps_profile",
+    [("RGB", "RGB", True), ("L", "L", True), ("CMYK", "RGB", False)],
+)
+def test_color_profile_matches_result(mode, expected_mode, keeps_profile):
+    srgb = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    buffer = io.BytesIO()
+    Image.new(mode, (40, 40)).save(
+        buffer, format="JPEG", icc_profile=srgb, comment=b"x"
+    )
+    upload = SimpleUploadedFile("photo.jpg", buffer.getvalue(), "image/jpeg")
+    image = Image.open(recompress(upload))
+    assert image.mode == expected_mode
+    assert ("icc_profile" in image.info) == keeps_profile, (
+        "Убедитесь, что цветовой профиль сохраняется, только если"
+        " подходит цветовому пространству результата."
+    )
+
+
+def test_small_clean_image_is_kept():
+    buffer = io.BytesIO()
+    Image.new("RGBA", (4, 4), (0, 0, 0, 0)).save(buffer, format="PNG")
+    upload = SimpleUploadedFile("dot.png", buffer.getvalue(), "image/png")
+    assert recompress(upload) is None
+
+
+def test_backfill_replaces_stored_originals(
+    settings,
+    media_root,
+    post_with_published_location: Model,
+    django_capture_on_commit_callbacks,
+):
+    settings.BLOG_IMAGE_MAX_SIZE = 300
+    post = post_with_published_location
+    with django_capture_on_commit_callbacks(execute=True):
+        post.image = photo((900, 300), orientation=1)
+        post.save()
+    old = ImageBlob.objects.get(name=post.image.name)
+    assert old.original_size is None
+
+    out = io.StringIO()
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("recompress_images", stdout=out)
+    post.refresh_from_db()
+    assert post.image.name != old.name
+    assert Image.open(post.image.path).size == (300, 100)
+    blob = ImageBlob.objects.get()
+    assert blob.name == post.image.name
+    assert blob.original_size == old.size and blob.savings > 0
+    # Старый оригинал без ссылок убирает collect_media_garbage
+    assert not ImageBlob.objects.filter(name=old.name).exists()
+    assert "экономия" in out.getvalue()
+
+    call_command("recompress_images", stdout=out)
+    assert ImageBlob.objects.get().name == post.image.name
@@ -0,0 +1,75 @@
+import io
+
+import pytest
+from blog.media_gc import Progress, collect
+from blog.models import ImageBlob
+from blog.storage import image_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Model
+from mixer.backend.django import Mixer
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+def png_upload(color, name="image.png"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10), color).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+
+def stored_files(root):
+    return sorted(path.name for path in root.rglob("*") if path.is_file())
+
+
+def test_same_content_is_stored_once(
+    mixer: Mixer, media_root, post_with_published_location: Model
+):
+    first = post_with_published_location
+    first.image = png_upload("red", "first.PNG")
+    first.save()
+    second = mixer.blend("blog.Post", image=None)
+    second.image = png_upload("red", "second.png")
+    second.save()
+
+    assert (
+        first.image.name == second.image.name
+    ), "Убедитесь, что одинаковые файлы сохраняются под одним именем."
+    digest = first.image.name.rsplit("/", 1)[1].split(".")[0]
+    assert len(digest) == 64 and first.image.name.endswith(".png")
+    assert stored_files(media_root).count(f"{digest}.png") == 1
+    blob = ImageBlob.objects.get(name=first.image.name)
+    assert blob.ref_count == 2 and blob.size > 0
+
+
+def test_file_is_removed_with_last_reference(
+    mixer: Mixer,
+    media_root,
+    post_with_published_location: Model,
+):
+    first = post_with_published_location
+    first.image = png_upload("blue")
+    first.save()
+    second = mixer.blend("blog.Post", image=None)
+    second.image = png_upload("blue")
+    second.save()
+
+    first.delete()
+    assert ImageBlob.objects.get().ref_count == 1
+    blue = second.image.name
+    second.image = png_upload("green")
+    second.save()
+    assert ImageBlob.objects.get().name == second.image.name
+    second.delete()
+    assert not ImageBlob.objects.exists()
+    assert image_storage.exists(blue) and image_storage.exists(
+        second.image.name
+    ), (
+        "Убедитесь, что файл без ссылок не удаляется сразу: его могла"
+        " переиспользовать параллельная загрузка того же содержимого."
+    )
+
+    collect(image_storage, Progress(), min_age=0)
+    assert stored_files(media_root) == [], (
+        "Убедитесь, что файлы без ссылок убирает сборщик мусора."
+    )
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+from blog.images import generate_variants
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Model
+from mixer.backend.django import Mixer
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+def jpeg_upload(size, name="big.jpg"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "teal").save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+@pytest.fixture
+def post_with_image(media_root, post_with_published_location):
+    post = post_with_published_location
+    post.image = jpeg_upload((2000, 1000))
+    post.save()
+    return post
+
+
+def test_variants_are_generated(post_with_image: Model):
+    post = post_with_image
+    assert post.image_meta == {} and post.responsive_image is None
+
+    meta = generate_variants(post.id)
+    assert (meta["width"], meta["height"]) == (2000, 1000)
+    assert [width for width, _ in meta["variants"]["webp"]] == [
+        320,
+        640,
+        1280,
+    ], "Убедитесь, что готовятся варианты шириной 320, 640 и 1280."
+    storage = post.image.storage
+    with storage.open(meta["variants"]["jpeg"][0][1]) as file:
+        assert Image.open(file).size == (320, 160)
+    assert meta["lqip"].startswith("data:image/jpeg;base64,")
+
+    post.refresh_from_db()
+    assert post.responsive_image["src"].endswith("-640.jpg")
+
+
+def test_card_uses_responsive_image(user_client, post_with_image: Model):
+    generate_variants(post_with_image.id)
+    content = user_client.get("/").content.decode()
+    assert (
+        'type="image/webp"' in content and "1280w" in content
+    ), "Убедитесь, что в карточке публикации выводится srcset."
+    assert 'loading="lazy"' in content and 'width="2000"' in content
+
+
+def test_new_image_resets_variants(post_with_image: Model):
+    post = post_with_image
+    generate_variants(post.id)
+    post.refresh_from_db()
+    post.image = jpeg_upload((100, 50), "small.jpg")
+    post.save()
+    assert (
+        post.image_meta == {}
+    ), "Убедитесь, что варианты старого изображения сбрасываются."
+    meta = generate_variants(post.id)
+    assert meta["variants"]["jpeg"][0][0] == 100
+
+
+def test_command_skips_posts_without_image(
+    post_with_image: Model, mixer: Mixer
+):
+    post = post_with_image
+    _, missing = mixer.cycle(2).blend(
+        type(post),
+        author=post.author,
+        category=post.category,
+        location=post.location,
+        image="",
+    )
+    # Сохранение через ORM записывает пустую строку, NULL остаётся
+    # от старых данных и ручных правок
+    type(post).objects.filter(pk=missing.pk).update(image=None)
+    output = io.StringIO()
+    call_command("generate_image_variants", stdout=output)
+    assert "Обработано: 1, с ошибками: 0" in output.getvalue(), (
+        "Убедитесь, что публикации без изображения не считаются ошибками."
+    )
@@ -0,0 +1,74 @@
+import pytest
+from blog.feed import get_feed_queryset
+from blog.models import Comment
+from blog.views import get_posts_queryset
+from django.db import connection
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != "sqlite", reason="План запроса SQLite"
+    ),
+]
+
+
+def assert_uses_index(queryset, index_name):
+    plan = queryset.explain()
+    assert index_name in plan, (
+        f"Убедитесь, что запрос использует индекс `{index_name}`, а не"
+        f" полный просмотр таблицы. План запроса:\n{plan}"
+    )
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan, (
+        "Убедитесь, что сортировка ленты берётся из индекса."
+        f" План запроса:\n{plan}"
+    )
+
+
+def test_index_feed_uses_published_index():
+    assert_uses_index(
+        get_posts_queryset(include_annotation_and_ordering=True)[:10],
+        "post_published_feed_idx",
+    )
+
+
+@pytest.mark.parametrize(
+    "queryset, index_name",
+    (
+        (lambda: get_feed_queryset(), "feed_pub_date_idx"),
+        (
+            lambda: get_feed_queryset().filter(category_id=1),
+            "feed_category_idx",
+        ),
+    ),
+)
+def test_materialized_feed_uses_covering_index(queryset, index_name):
+    assert_uses_index(queryset()[10:20], f"COVERING INDEX {index_name}")
+
+
+def test_category_feed_uses_category_index():
+    assert_uses_index(
+        get_posts_queryset(include_annotation_and_ordering=True).filter(
+            category_id=1
+        )[:10],
+        "post_category_feed_idx",
+    )
+
+
+@pytest.mark.parametrize("apply_publication_filters", (True, False))
+def test_profile_feed_uses_author_index(apply_publication_filters):
+    assert_uses_index(
+        get_posts_queryset(
+            apply_publication_filters=apply_publication_filters,
+            include_annotation_and_ordering=True,
+        ).filter(author_id=1)[:10],
+        "post_author_feed_idx",
+    )
+
+
+def test_post_comments_use_post_path_index():
+    assert_uses_index(
+        Comment.objects.filter(post_id=1, path__gt="0000001").order_by("path")[
+            :20
+        ],
+        "comment_post_path_idx",
+    )
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+from blog.media import serve_media
+from django.test import Client, RequestFactory
+
+HASHED = "post_images/ab/" + "ab" * 32 + ".png"
+
+
+@pytest.fixture
+def media(media_root):
+    for name in ("post_images/photo.jpg", HASHED, "post_images/x.part"):
+        path = media_root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes(range(100)))
+    return media_root
+
+
+def test_file_is_served_with_validators(client: Client, media):
+    response = client.get("/media/post_images/photo.jpg")
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == bytes(range(100))
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["Content-Type"] == "image/jpeg"
+    assert "immutable" not in response["Cache-Control"]
+
+    response = client.get(
+        "/media/post_images/photo.jpg", HTTP_IF_NONE_MATCH=response["ETag"]
+    )
+    assert (
+        response.status_code == 304
+    ), "Убедитесь, что неизменившийся файл не передаётся повторно."
+
+
+def test_hashed_names_are_immutable(client: Client, media):
+    response = client.get(f"/media/{HASHED}")
+    assert response["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response["ETag"] == f'"{"ab" * 32}"'
+
+
+@pytest.mark.parametrize(
+    "header, status, body, content_range",
+    (
+        ("bytes=10-19", 206, bytes(range(10, 20)), "bytes 10-19/100"),
+        ("bytes=95-", 206, bytes(range(95, 100)), "bytes 95-99/100"),
+        ("bytes=-3", 206, bytes(range(97, 100)), "bytes 97-99/100"),
+        ("bytes=100-", 416, b"", "bytes */100"),
+    ),
+)
+def test_byte_ranges(
+    client: Client, media, header, status, body, content_range
+):
+    response = client.get("/media/post_images/photo.jpg", HTTP_RANGE=header)
+    assert response.status_code == status
+    assert response["Content-Range"] == content_range
+    if status == 206:
+        assert b"".join(response.streaming_content) == body
+        assert int(response["Content-Length"]) == len(body)
+
+
+def test_ranges_can_use_sendfile(media):
+    request = RequestFactory().get(
+        "/media/post_images/photo.jpg", HTTP_RANGE="bytes=10-19"
+    )
+    response = serve_media(request, "post_images/photo.jpg")
+    file = response.file_to_stream
+    assert file is not None and (
+        os.lseek(file.fileno(), 0, os.SEEK_CUR) == 10
+    ), (
+        "Убедитесь, что диапазон отдаётся через FileResponse из файла,"
+        " открытого с начала диапазона: так его сможет отдать sendfile."
+    )
+    assert b"".join(response.streaming_content) == bytes(range(10, 20))
+    file.close()
+
+
+def test_stale_if_range_returns_whole_file(client: Client, media):
+    response = client.get(
+        "/media/post_images/photo.jpg",
+        HTTP_RANGE="bytes=0-9",
+        HTTP_IF_RANGE='"outdated"',
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "url", ("/media/post_images/x.part", "/media/../manage.py", "/media/")
+)
+def test_hidden_files_are_not_served(client: Client, media, url):
+    assert client.get(url).status_code == 404
+
+
+def test_sendfile_mode(client: Client, media, settings):
+    settings.BLOG_MEDIA_SENDFILE = "x-accel-redirect"
+    response = client.get("/media/post_images/photo.jpg")
+    assert response["X-Accel-Redirect"] == (
+        "/protected-media/post_images/photo.jpg"
+    )
+    assert response.content == b""
@@ -0,0 +1,100 @@
+import io
+import os
+import time
+
+import pytest
+from blog.images import variant_name
+from blog.media_gc import Progress, collect, iter_files
+from blog.storage import image_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Model
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+def write(root, name, age=7200):
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * 10)
+    past = time.time() - age
+    os.utime(path, (past, past))
+    return name
+
+
+@pytest.fixture
+def media(post_with_published_location: Model, media_root):
+    post = post_with_published_location
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10), "red").save(buffer, format="PNG")
+    post.image = SimpleUploadedFile("a.png", buffer.getvalue())
+    post.save()
+    live = post.image.name
+    orphans = [
+        write(media_root, "post_images/00/old.png"),
+        write(media_root, "post_images/legacy.jpg"),
+        write(media_root, variant_name("post_images/gone.jpg", 320, "jpg")),
+        write(media_root, "post_images/00/tmpabc.part"),
+    ]
+    kept = [
+        live,
+        write(media_root, variant_name(live, 320, "webp")),
+        write(media_root, "post_images/00/new.png", age=0),
+    ]
+    return media_root, orphans, kept
+
+
+def existing(root, names):
+    return [name for name in names if (root / name).exists()]
+
+
+def test_files_are_listed_in_string_order(media_root):
+    names = [
+        write(media_root, "post_images/ab/x.png"),
+        write(media_root, "post_images/ab.jpg"),
+        write(media_root, "post_images/ab-c.jpg"),
+        write(media_root, "post_images/b.jpg"),
+    ]
+    assert list(iter_files(image_storage, "post_images")) == sorted(names)
+    assert list(
+        iter_files(image_storage, "post_images", "post_images/ab.jpg")
+    ) == ["post_images/ab/x.png", "post_images/b.jpg"]
+
+
+def test_dry_run_keeps_files(media):
+    root, orphans, kept = media
+    out = io.StringIO()
+    call_command("collect_media_garbage", "--dry-run", stdout=out)
+    assert existing(root, orphans) == orphans
+    for name in orphans:
+        assert name in out.getvalue()
+    assert "Будет удалено: 4, 40 байт" in out.getvalue()
+
+
+def test_orphans_are_deleted(media):
+    root, orphans, kept = media
+    call_command("collect_media_garbage", "--rate=0", stdout=io.StringIO())
+    assert (
+        existing(root, orphans) == []
+    ), "Убедитесь, что файлы без ссылок удаляются."
+    assert (
+        existing(root, kept) == kept
+    ), "Убедитесь, что нужные и недавно загруженные файлы остаются."
+    assert not (root / ".media_gc.json").exists()
+
+
+def test_collection_resumes(media):
+    root, orphans, kept = media
+
+    def interrupt(progress):
+        raise KeyboardInterrupt
+
+    progress = Progress()
+    with pytest.raises(KeyboardInterrupt):
+        collect(image_storage, progress, batch_size=2, on_batch=interrupt)
+    assert progress.scanned == 2
+    collect(image_storage, progress, batch_size=2)
+    assert progress.scanned == len(orphans) + len(kept)
+    assert existing(root, orphans) == []
+    assert existing(root, kept) == kept
@@ -0,0 +1,118 @@
+import pytest
+from blog.cache import check_shared_page_cache, invalidate, scope_versions
+from django.core.cache import cache, caches
+from django.db.models import Model
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_anonymous_post_page_is_cached_and_purged(
+    client,
+    mixer: Mixer,
+    django_assert_num_queries,
+    post_with_published_location,
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    client.get(url)
+    with django_assert_num_queries(0):
+        cached = client.get(url)
+    assert cached.status_code == 200, (
+        "Убедитесь, что страница публикации для анонимных посетителей"
+        " отдаётся из кэша."
+    )
+
+    comment = mixer.blend("blog.Comment", post=post, text="Свежий комментарий")
+    assert (
+        comment.text in client.get(url).content.decode()
+    ), "Убедитесь, что кэш страницы сбрасывается при добавлении комментария."
+
+
+def test_logged_in_user_sees_own_writes(
+    client, user_client, post_with_published_location: Model
+):
+    post = post_with_published_location
+    url = f"/profile/{post.author.username}/"
+    client.get(url)
+
+    post.title = "Обновлённый заголовок"
+    post.save()
+    assert post.title in user_client.get(url).content.decode()
+    assert (
+        post.title in client.get(url).content.decode()
+    ), "Убедитесь, что кэш профиля сбрасывается при изменении публикации."
+
+
+def test_username_change_purges_profile(client, user, user_client):
+    old_url = f"/profile/{user.username}/"
+    assert client.get(old_url).status_code == 200
+
+    user_client.post(
+        "/auth/account/edit/",
+        data={"username": "renamed_user", "email": "renamed@example.com"},
+    )
+    assert (
+        client.get(old_url).status_code == 404
+    ), "Убедитесь, что смена имени пользователя сбрасывает кэш его профиля."
+
+
+def test_post_card_follows_post_version(
+    user_client, mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    stale = type(post).objects.get(pk=post.pk)
+    user_client.get("/")
+
+    mixer.blend("blog.Comment", post=post)
+    assert "Комментарии (1)" in user_client.get("/").content.decode(), (
+        "Убедитесь, что карточка публикации перерисовывается"
+        " после добавления комментария."
+    )
+
+    stale.title = "Заголовок из устаревшего экземпляра"
+    stale.save()
+    assert stale.title in user_client.get("/").content.decode(), (
+        "Убедитесь, что версия карточки меняется при каждом сохранении"
+        " публикации."
+    )
+
+
+def test_anonymous_feed_is_purged_by_new_post(
+    client, mixer: Mixer, post_with_published_location: Model
+):
+    post = post_with_published_location
+    client.get("/")
+    fresh = mixer.blend(
+        "blog.Post",
+        author=post.author,
+        category=post.category,
+        is_published=True,
+        pub_date=post.pub_date,
+    )
+    assert fresh.title in client.get("/").content.decode(), (
+        "Убедитесь, что кэш главной страницы сбрасывается при появлении"
+        " новой публикации."
+    )
+
+
+def test_scope_versions_live_in_page_cache(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        "pages": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "pages",
+        },
+    }
+    settings.BLOG_PAGE_CACHE_ALIAS = "pages"
+    invalidate("index")
+    [version] = scope_versions("index")
+    assert caches["pages"].get("blog:scope:index") == version, (
+        "Убедитесь, что версии областей хранятся в кэше страниц."
+    )
+    assert cache.get("blog:scope:index") is None
+
+    settings.DEBUG = False
+    assert [message.id for message in check_shared_page_cache()] == [
+        "blog.W002"
+    ], "Убедитесь, что кэш, видимый одному процессу, вызывает предупреждение."
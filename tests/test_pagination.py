@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+import pytest
+from blog.pagination import WindowedPaginator
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def no_page_cache(settings):
+    # Ленты проверяются по контексту шаблона, а у ответа из кэша
+    # страниц его нет
+    settings.BLOG_PAGE_CACHE_TIMEOUT = 0
+
+
+@pytest.fixture
+def feed_posts(mixer: Mixer, user, published_category):
+    now = timezone.now()
+    # Пары публикаций с одинаковой датой проверяют сортировку по id
+    dates = (now - timedelta(hours=i // 2) for i in range(1, 26))
+    return mixer.cycle(25).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=dates,
+    )
+
+
+def test_cursor_pagination_walks_whole_feed(client, feed_posts):
+    expected = [
+        post.id
+        for post in sorted(
+            feed_posts, key=lambda p: (p.pub_date, p.id), reverse=True
+        )
+    ]
+
+    url = "/"
+    seen = []
+    with override_settings(
+        BLOG_CURSOR_PAGINATION=True, BLOG_OFFSET_PAGINATION_PAGES=1
+    ):
+        page_obj = client.get(url).context["page_obj"]
+        seen += [post.id for post in page_obj]
+        while page_obj.has_next():
+            url = f"/?after={page_obj.next_cursor}"
+            page_obj = client.get(url).context["page_obj"]
+            seen += [post.id for post in page_obj]
+
+    assert seen == expected, (
+        "Убедитесь, что курсорная пагинация показывает все публикации"
+        " без пропусков и повторов в порядке «от новых к старым»."
+    )
+
+    previous = client.get(f"/?before={page_obj.previous_cursor}")
+    assert [post.id for post in previous.context["page_obj"]] == (
+        expected[10:20]
+    ), "Убедитесь, что ссылка «назад» ведёт на предыдущую страницу."
+
+
+def test_cursor_handover_page_links_no_deep_offsets(client, feed_posts):
+    with override_settings(
+        BLOG_CURSOR_PAGINATION=True, BLOG_OFFSET_PAGINATION_PAGES=1
+    ):
+        content = client.get("/").content.decode()
+    assert "?after=" in content
+    assert "?page=2" not in content and "?page=3" not in content, (
+        "Убедитесь, что после перехода на курсорную пагинацию шаблон"
+        " не ссылается на глубокие страницы по номеру."
+    )
+
+
+def test_broken_cursor_falls_back_to_first_page(client, feed_posts):
+    response = client.get("/?after=not-a-cursor")
+    assert response.status_code == 200
+    assert len(response.context["page_obj"]) == 10
+
+
+def test_paginator_renders_window_of_links():
+    page = WindowedPaginator(range(1000), 10, num_links=5).get_page(50)
+    assert list(page.page_window) == [48, 49, 50, 51, 52], (
+        "Убедитесь, что пагинатор выводит только окно соседних страниц."
+    )
+    last = WindowedPaginator(range(1000), 10, num_links=5).get_page(100)
+    assert list(last.page_window) == [96, 97, 98, 99, 100]
+
+
+def test_feed_count_is_cached_until_posts_change(
+    client, mixer: Mixer, feed_posts
+):
+    client.get("/")
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/")
+    assert not any("COUNT(" in q["sql"] for q in queries), (
+        "Убедитесь, что количество публикаций в ленте берётся из кэша."
+    )
+    assert response.context["page_obj"].paginator.count == 25
+
+    post = feed_posts[0]
+    post.pk = None
+    post.save()
+    response = client.get("/")
+    assert response.context["page_obj"].paginator.count == 26, (
+        "Убедитесь, что кэш количества сбрасывается при изменении публикаций."
+    )
@@ -0,0 +1,42 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Model
+
+pytestmark = [pytest.mark.django_db]
+
+TEXT = "<b>Один</b> два три четыре пять\nшесть семь восемь девять десять 11"
+
+
+def test_excerpt_and_html_are_rendered_on_save(
+    post_with_published_location: Model,
+):
+    post = post_with_published_location
+    post.text = TEXT
+    post.save()
+    post.refresh_from_db()
+    assert post.excerpt == (
+        "<b>Один</b> два три четыре пять шесть семь восемь девять десять …"
+    ), "Убедитесь, что анонс публикации готовится при сохранении."
+    assert post.text_html.startswith(
+        "&lt;b&gt;Один&lt;/b&gt;"
+    ), "Убедитесь, что HTML текста публикации экранируется."
+    assert "пять<br>шесть" in post.text_html
+
+
+def test_render_posts_backfills(post_with_published_location: Model):
+    post = post_with_published_location
+    type(post).objects.filter(pk=post.pk).update(excerpt="", text_html="")
+    version = post.version
+
+    call_command("render_posts", stdout=StringIO())
+
+    post.refresh_from_db()
+    assert (
+        post.excerpt and post.text_html
+    ), "Убедитесь, что команда `render_posts` заполняет анонсы и HTML."
+    assert post.version != version, (
+        "Убедитесь, что `render_posts` меняет версию публикации, "
+        "чтобы закэшированные карточки обновились."
+    )
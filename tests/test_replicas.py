@@ -0,0 +1,177 @@
+import sqlite3
+import time
+from datetime import timedelta
+
+import pytest
+from blog import replicas
+from blog.cache import add_cache_scopes
+from blog.models import Category, Post, ReplicaStamp
+from blog.replicas import (
+    STICKY_COOKIE,
+    ReplicaRouter,
+    copy_database,
+    forget_stamps,
+    fresh_replicas,
+    read_from_replica,
+    required_stamp,
+)
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Model
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+@pytest.fixture
+def replica(settings):
+    settings.BLOG_READ_REPLICAS = ["default"]
+    forget_stamps()
+    yield "default"
+    forget_stamps()
+
+
+def stamp(**ago):
+    ReplicaStamp.objects.update_or_create(
+        pk=1, defaults={"stamped_at": timezone.now() - timedelta(**ago)}
+    )
+    forget_stamps()
+
+
+@pytest.mark.django_db
+def test_only_fresh_replicas_are_used(replica):
+    assert fresh_replicas(0) == [], "Реплика без отметки считается отставшей."
+    stamp(seconds=1)
+    assert fresh_replicas(0) == [replica]
+    assert fresh_replicas(time.time()) == [], (
+        "Убедитесь, что после своей записи пользователь не читает реплику,"
+        " которая её ещё не содержит."
+    )
+    stamp(minutes=5)
+    assert (
+        fresh_replicas(0) == []
+    ), "Убедитесь, что сильно отставшая реплика не используется."
+
+
+@pytest.mark.django_db
+def test_router_uses_replicas_only_in_marked_views(replica):
+    stamp(seconds=1)
+    router = ReplicaRouter()
+
+    @read_from_replica
+    def view(request):
+        return router.db_for_read(Post)
+
+    factory = RequestFactory()
+    assert router.db_for_read(Post) is None
+    assert view(factory.get("/")) == replica
+    assert view(factory.post("/")) is None
+    sticky = factory.get("/")
+    sticky.COOKIES[STICKY_COOKIE] = str(time.time())
+    assert view(sticky) == "default"
+    assert router.db_for_write(Post) == "default"
+
+
+@pytest.mark.django_db
+def test_write_makes_reads_sticky(
+    user_client: Client, post_with_published_location: Model
+):
+    post = post_with_published_location
+    response = user_client.get(f"/posts/{post.id}/")
+    assert STICKY_COOKIE not in response.cookies
+    response = user_client.post(
+        f"/posts/{post.id}/comment/", {"text": "Новый комментарий"}
+    )
+    assert (
+        STICKY_COOKIE in response.cookies
+    ), "Убедитесь, что после записи ответ отмечает момент записи в cookie."
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_copy_contains_stamp(tmp_path, post_with_published_location):
+    path = tmp_path / "replica.sqlite3"
+    copy_database(str(path))
+    with sqlite3.connect(path) as replica:
+        posts = replica.execute("SELECT COUNT(*) FROM blog_post").fetchone()
+        stamps = replica.execute(
+            "SELECT COUNT(*) FROM blog_replicastamp"
+        ).fetchone()
+    replica.close()
+    assert posts == (Post.objects.count(),)
+    assert stamps == (1,)
+
+
+@pytest.fixture
+def replica_reads(replica, monkeypatch):
+    """Модели, прочитанные представлением, и разрешено ли было им реплики"""
+    reads = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def spy(self, model, **hints):
+        reads.append((model, replicas._replica_request.get() is not None))
+        return db_for_read(self, model, **hints)
+
+    monkeypatch.setattr(ReplicaRouter, "db_for_read", spy)
+    return reads
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url, model",
+    [
+        ("/posts/{post.id}/", Post),
+        ("/posts/{post.id}/comments/", Post),
+        ("/category/{post.category.slug}/", Category),
+        ("/profile/{post.author.username}/", get_user_model()),
+    ],
+)
+def test_page_object_is_read_from_primary(
+    client: Client, post_with_published_location, replica_reads, url, model
+):
+    stamp(seconds=1)
+    response = client.get(url.format(post=post_with_published_location))
+    assert response.status_code == 200
+    first = next(allowed for read, allowed in replica_reads if read is model)
+    assert not first, (
+        "Убедитесь, что объект, по которому страница узнаёт свои области"
+        " кэша, читается из основной базы: до add_cache_scopes реплика"
+        " может вернуть устаревшую версию."
+    )
+
+
+@pytest.mark.django_db
+def test_evicted_scope_versions_do_not_disable_replicas(
+    client: Client, post_with_published_location, replica
+):
+    post = post_with_published_location
+    stamp(seconds=1)
+    cache.clear()
+    request = RequestFactory().get("/")
+    add_cache_scopes(request, f"post:{post.pk}", "index")
+    changed, cacheable = required_stamp(request)
+    assert fresh_replicas(changed) == [replica], (
+        "Убедитесь, что версии областей, пропавшие из кэша, не требуют"
+        " от реплики данных на текущий момент."
+    )
+    assert cacheable > replicas.replica_stamp(replica)
+
+    cache.clear()
+    response = client.get(f"/posts/{post.id}/")
+    assert response.status_code == 200
+    assert not response.has_header("ETag"), (
+        "Убедитесь, что страница, прочитанная из реплики, которая не догнала"
+        " заново заведённые версии областей, не получает ETag."
+    )
+    with CaptureQueriesContext(connection) as queries:
+        client.get(f"/posts/{post.id}/")
+    assert queries, (
+        "Убедитесь, что такая страница не сохраняется в кэше страниц."
+    )
+
+    stamp(seconds=0)
+    response = client.get(f"/posts/{post.id}/")
+    assert response.has_header("ETag"), (
+        "Убедитесь, что страница снова кэшируется, когда реплика догнала"
+        " версии областей."
+    )
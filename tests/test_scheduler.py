@@ -0,0 +1,60 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from blog.models import SchedulerRun
+from blog.scheduler import last_run, next_publication
+from blog.signals import post_published
+from django.core.management import call_command
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_scheduler_releases_due_posts(mixer: Mixer, user, published_category):
+    now = timezone.now()
+    due, later = mixer.cycle(2).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=mixer.sequence(
+            now - timedelta(seconds=5), now + timedelta(days=1)
+        ),
+    )
+    assert next_publication(now) == later.pub_date
+
+    released = []
+
+    def on_published(sender, posts, **kwargs):
+        released.extend(posts)
+
+    post_published.connect(on_published)
+    SchedulerRun.objects.create(published_until=now - timedelta(minutes=1))
+    try:
+        call_command("run_scheduler", once=True, stdout=StringIO())
+    finally:
+        post_published.disconnect(on_published)
+
+    assert released == [due], (
+        "Убедитесь, что планировщик выпускает только публикации,"
+        " время которых наступило."
+    )
+    assert last_run() > now
+
+
+def test_first_run_catches_up(mixer: Mixer, user, published_category):
+    missed = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=timezone.now() - timedelta(hours=1),
+    )
+    output = StringIO()
+    call_command("run_scheduler", once=True, stdout=output)
+    assert str(missed) in output.getvalue(), (
+        "Убедитесь, что запуск из cron выпускает публикации, время"
+        " которых наступило, пока планировщик не работал."
+    )
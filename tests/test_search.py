@@ -0,0 +1,61 @@
+from io import StringIO
+
+import pytest
+from blog.admin import PostAdmin
+from blog.models import Post
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db.models import Model
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def searchable_post(post_with_published_location: Model) -> Model:
+    post = post_with_published_location
+    post.title = "Путешествие на Байкал"
+    post.text = "Зимой лёд <b>Байкала</b> прозрачный, как стекло."
+    post.save()
+    return post
+
+
+def test_search_ranks_and_highlights(client, searchable_post):
+    response = client.get("/api/search/", {"q": "байкал"})
+    results = response.json()["results"]
+    assert [result["id"] for result in results] == [
+        searchable_post.id
+    ], "Убедитесь, что поиск находит публикацию по слову из заголовка."
+    assert "<mark>Байкал</mark>" in results[0]["title"]
+    assert (
+        "&lt;b&gt;" in results[0]["snippet"]
+    ), "Убедитесь, что фрагменты текста в результатах поиска экранируются."
+
+    page = client.get("/search/", {"q": "прозрачн"}).content.decode()
+    assert (
+        "<mark>прозрачный</mark>" in page
+    ), "Убедитесь, что последнее слово запроса ищется как префикс."
+
+
+def test_search_hides_invisible_and_follows_edits(client, searchable_post):
+    searchable_post.is_published = False
+    searchable_post.save()
+    assert not client.get("/api/search/", {"q": "байкал"}).json()["results"]
+
+    searchable_post.is_published = True
+    searchable_post.title = "Поход на Эльбрус"
+    searchable_post.save()
+    assert client.get("/api/search/", {"q": "эльбрус"}).json()[
+        "results"
+    ], "Убедитесь, что индекс обновляется при изменении публикации."
+
+
+def test_admin_search_and_rebuild(searchable_post):
+    Post.objects.filter(pk=searchable_post.pk).update(title="Озеро Рица")
+    call_command("rebuild_search", stdout=StringIO())
+
+    admin = PostAdmin(Post, site)
+    queryset, may_have_duplicates = admin.get_search_results(
+        None, Post.objects.all(), "рица"
+    )
+    assert list(queryset) == [searchable_post]
+    assert not may_have_duplicates
@@ -0,0 +1,159 @@
+import fcntl
+import hashlib
+import io
+
+import pytest
+from blog import forms
+from blog.models import ImageBlob, Post, UploadSession
+from blog.uploads import forget_digest, open_upload, upload_path
+from django.db.models import Model
+from django.test import Client
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def photo():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "purple").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def start(client, data, **extra):
+    response = client.post(
+        "/api/uploads/", {"filename": "photo.jpg", "size": len(data), **extra}
+    )
+    assert response.status_code == 201, (
+        "Убедитесь, что загрузка по частям начинается запросом POST"
+        " на `/api/uploads/`."
+    )
+    return response.json()
+
+
+def put(client, state, data, first, last):
+    return client.put(
+        state["url"],
+        data[first : last + 1],
+        content_type="application/octet-stream",
+        headers={"Content-Range": f"bytes {first}-{last}/{len(data)}"},
+    )
+
+
+def test_upload_resumes_after_disconnect(
+    user_client: Client, media_root, photo
+):
+    state = start(user_client, photo)
+    middle = len(photo) // 2
+    response = put(user_client, state, photo, 0, middle - 1)
+    assert response.json()["offset"] == middle
+
+    # Часть, отправленная повторно, указывает, откуда продолжать
+    response = put(user_client, state, photo, 0, middle - 1)
+    assert response.status_code == 409
+    assert int(response["Upload-Offset"]) == middle
+    assert user_client.get(state["url"]).json()["offset"] == middle
+
+    forget_digest(state["token"])
+    response = put(user_client, state, photo, middle, len(photo) - 1)
+    assert response.json()["complete"]
+    session = UploadSession.objects.get()
+    assert (
+        session.sha256 == hashlib.sha256(photo).hexdigest()
+    ), "Убедитесь, что контрольная сумма считается по всему файлу."
+    with open(upload_path(session.token), "rb") as file:
+        assert file.read() == photo
+
+
+def test_overlapping_parts_do_not_corrupt_file(
+    user_client: Client, media_root, photo
+):
+    state = start(user_client, photo)
+    middle = len(photo) // 2
+    with open(upload_path(state["token"]), "rb") as stalled:
+        # Оборвавшийся запрос ещё пишет свою часть
+        fcntl.flock(stalled, fcntl.LOCK_EX)
+        response = put(user_client, state, photo, 0, middle - 1)
+        assert response.status_code == 423, (
+            "Убедитесь, что часть не пишется, пока файл загрузки"
+            " пишет другой запрос."
+        )
+    put(user_client, state, photo, 0, middle - 1)
+    # Запоздавший повтор той же части не обрезает принятые байты
+    response = put(user_client, state, photo, 0, 9)
+    assert response.status_code == 409
+    with open(upload_path(state["token"]), "rb") as file:
+        assert file.read() == photo[:middle]
+    response = put(user_client, state, photo, middle, len(photo) - 1)
+    assert response.json()["complete"]
+
+
+def test_checksum_mismatch_discards_upload(
+    user_client: Client, media_root, photo
+):
+    state = start(user_client, photo, sha256="0" * 64)
+    response = put(user_client, state, photo, 0, len(photo) - 1)
+    assert response.status_code == 422
+    assert not UploadSession.objects.exists()
+    assert not list((media_root / "uploads").iterdir())
+
+
+def test_uploads_belong_to_their_author(
+    user_client: Client, another_user_client: Client, media_root, photo
+):
+    state = start(user_client, photo)
+    assert another_user_client.get(state["url"]).status_code == 404
+    response = user_client.post(
+        "/api/uploads/", {"filename": "notes.txt", "size": 10}
+    )
+    assert response.status_code == 400
+
+
+def test_post_form_accepts_upload_token(
+    user_client: Client,
+    media_root,
+    photo,
+    published_category: Model,
+):
+    state = start(user_client, photo)
+    put(user_client, state, photo, 0, len(photo) - 1)
+    response = user_client.post(
+        "/posts/create/",
+        {
+            "title": "Заголовок",
+            "text": "Текст",
+            "pub_date": "2020-01-01T10:00",
+            "category": published_category.pk,
+            "upload": state["token"],
+        },
+    )
+    assert response.status_code == 302
+    post = Post.objects.get(title="Заголовок")
+    assert post.image and ImageBlob.objects.filter(name=post.image.name)
+    assert (
+        not UploadSession.objects.exists()
+    ), "Убедитесь, что загрузка удаляется после сохранения публикации."
+    assert not list((media_root / "uploads").iterdir())
+
+
+def test_invalid_post_form_closes_upload(
+    user_client: Client, media_root, photo, monkeypatch
+):
+    opened = []
+
+    def spy(session):
+        opened.append(open_upload(session))
+        return opened[-1]
+
+    monkeypatch.setattr(forms, "open_upload", spy)
+    state = start(user_client, photo)
+    put(user_client, state, photo, 0, len(photo) - 1)
+    response = user_client.post(
+        "/posts/create/",
+        {"title": "", "text": "Текст", "upload": state["token"]},
+    )
+    assert response.status_code == 200
+    assert opened and all(upload.closed for upload in opened), (
+        "Убедитесь, что файл загрузки закрывается, если форма публикации"
+        " не прошла проверку."
+    )
@@ -0,0 +1,68 @@
+import pytest
+from django.db.models import Model
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_category_toggle_updates_post_visibility(
+    post_with_published_location: Model,
+):
+    post = post_with_published_location
+    category = post.category
+    assert post.is_visible
+
+    category.is_published = False
+    category.save()
+    post.refresh_from_db()
+    assert not post.is_visible, (
+        "Убедитесь, что снятие категории с публикации скрывает её посты."
+    )
+
+    category.is_published = True
+    category.save()
+    post.refresh_from_db()
+    assert post.is_visible, (
+        "Убедитесь, что возврат категории в публикацию снова показывает"
+        " её посты."
+    )
+
+
+def test_location_toggle_updates_visible_location(
+    post_with_published_location: Model,
+):
+    post = post_with_published_location
+    location = post.location
+    assert post.visible_location == location
+
+    location.is_published = False
+    location.save()
+    post.refresh_from_db()
+    assert post.visible_location is None, (
+        "Убедитесь, что снятое с публикации местоположение не показывается"
+        " в постах."
+    )
+
+
+def test_category_description_edit_keeps_posts(
+    post_with_published_location: Model, django_assert_max_num_queries
+):
+    post = post_with_published_location
+    category = type(post.category).objects.get(pk=post.category_id)
+    version = post.version
+
+    category.description = "Новое описание"
+    with django_assert_max_num_queries(1):
+        category.save()
+    post.refresh_from_db()
+    assert post.version == version, (
+        "Убедитесь, что правка описания категории не пересчитывает"
+        " видимость, версии и подсказки её публикаций."
+    )
+
+    category.title = "Новое название"
+    category.save()
+    post.refresh_from_db()
+    assert post.version != version, (
+        "Убедитесь, что после смены названия категории карточки её"
+        " публикаций отрисовываются заново."
+    )
@@ -0,0 +1,58 @@
+import pytest
+from blog.models import Comment
+from blog.writes import WriteQueue, retry_locked
+from django.db import OperationalError
+from django.db.models import Model
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = WriteQueue(10, 0.2, tmp_path / "write-lock")
+    yield writer
+    writer.close()
+
+
+def test_locked_database_is_retried(settings):
+    settings.BLOG_WRITE_RETRY_DELAY = 0
+    calls = []
+
+    def write():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OperationalError("database is locked")
+        return "ok"
+
+    assert retry_locked(write) == "ok"
+    assert len(calls) == 3, "Убедитесь, что запись повторяется."
+
+    settings.BLOG_WRITE_RETRIES = 1
+    calls.clear()
+    with pytest.raises(OperationalError):
+        retry_locked(write)
+    assert len(calls) == 2, "Убедитесь, что число повторов ограничено."
+
+
+def test_small_writes_are_group_committed(
+    writer: WriteQueue, mixer, post_with_published_location: Model, user
+):
+    comments = [
+        mixer.blend(
+            "blog.Comment",
+            post=post_with_published_location,
+            author=user,
+            commit=False,
+        )
+        for _ in range(5)
+    ]
+    futures = [writer.submit(comment.save) for comment in comments]
+    failed = writer.submit(lambda: 1 / 0)
+    for future in futures:
+        future.result()
+    with pytest.raises(ZeroDivisionError):
+        failed.result()
+    assert (
+        writer.commits == 1
+    ), "Убедитесь, что записи из одного окна фиксируются одной транзакцией."
+    assert Comment.objects.count() == 5